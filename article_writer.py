@@ -0,0 +1,54 @@
+import os
+import csv
+import json
+
+FIELDS = ['Title', 'Author', 'Year', 'URL']
+
+class ArticleWriter:
+    """Append article rows to a CSV or newline-delimited JSON file as they arrive.
+
+    The format follows the file extension: .jsonl/.ndjson write one JSON object
+    per line, anything else writes CSV with a header row.
+    """
+
+    def __init__(self, filename='articles.csv', append=False, flush_every=10):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.count = 0
+        self.jsonl = filename.endswith(('.jsonl', '.ndjson'))
+
+        # Only write a CSV header when starting a new (or empty) file
+        write_header = not (append and os.path.exists(filename) and os.path.getsize(filename) > 0)
+        self.file = open(filename, 'a' if append else 'w', newline='', encoding='utf-8')
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS, extrasaction='ignore')
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.jsonl:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        else:
+            self.writer.writerow(row)
+        self.count += 1
+
+        # Flush periodically so a crash keeps everything written so far
+        if self.count % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def save_articles(rows, filename='articles.csv', append=False, flush_every=10):
+    """Stream rows from any iterable into filename and return how many were written"""
+    with ArticleWriter(filename, append=append, flush_every=flush_every) as writer:
+        for row in rows:
+            writer.write(row)
+    print(f"Results saved to {filename} ({writer.count} articles)")
+    return writer.count
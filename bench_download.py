@@ -0,0 +1,77 @@
+import os
+import time
+import tempfile
+import contextlib
+from http.server import BaseHTTPRequestHandler
+import requests
+from bench_fetch import serve
+from pdf_download import Downloader
+from pdf_store import PDFStore
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Serves a fixed-size PDF-looking body for every path, after a per-request latency"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    size = 1 << 20
+    latency = 0.1
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        # Vary the body by path so every URL is a distinct paper to the store
+        header = b'%PDF-1.4\n%' + self.path.encode('utf-8') + b'\n'
+        body = header + b'0' * max(0, self.size - len(header) - 7) + b'\n%%EOF\n'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def bench_serial(urls, directory):
+    """The old gs_scholar_pdf loop: requests.get without streaming, one file at a time"""
+    start = time.perf_counter()
+    total = 0
+    for url in urls:
+        response = requests.get(url)
+        response.raise_for_status()
+        with open(os.path.join(directory, url.split('/')[-1]), 'wb') as file:
+            file.write(response.content)
+        total += len(response.content)
+    return total, time.perf_counter() - start
+
+def bench_downloader(urls, directory, workers):
+    downloader = Downloader(PDFStore(directory), workers=workers, per_host=workers)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        report = downloader.run([(url, None) for url in urls])
+    assert report['ok'] == len(urls), f"{report['failed']} downloads failed"
+    return report['bytes'], report['seconds']
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the PDF downloader against a local file server')
+    parser.add_argument('-n', '--files', type=int, default=40, help='Files per run (default: 40)')
+    parser.add_argument('--size', type=int, default=1 << 20, help='Bytes per file (default: 1 MiB)')
+    parser.add_argument('--latency', type=float, default=0.1,
+                        help='Server latency per request in seconds (default: 0.1)')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 4, 8],
+                        help='Worker counts to benchmark (default: 1 4 8)')
+    args = parser.parse_args()
+
+    FileHandler.size = args.size
+    FileHandler.latency = args.latency
+    with serve(FileHandler) as base_url, tempfile.TemporaryDirectory() as tmp_dir:
+        urls = [f"{base_url}/files/paper_{i}.pdf" for i in range(args.files)]
+
+        runs = [('serial requests.get', lambda directory: bench_serial(urls, directory))]
+        for workers in args.workers:
+            runs.append((f"Downloader workers={workers}",
+                         lambda directory, workers=workers: bench_downloader(urls, directory, workers)))
+
+        for index, (name, run) in enumerate(runs):
+            directory = os.path.join(tmp_dir, str(index))
+            os.makedirs(directory)
+            total, elapsed = run(directory)
+            print(f"{name:24} {args.files / elapsed:7.1f} files/sec {total / elapsed / 1e6:8.1f} MB/s")
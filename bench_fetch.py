@@ -0,0 +1,141 @@
+import os
+import time
+import tempfile
+import threading
+import contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+from gs_fetch import Fetcher
+from gs_checkpoint import Checkpoint
+from bench_parse import ITEM_TEMPLATE
+
+def make_page(items_per_page=10):
+    items = ''.join(ITEM_TEMPLATE.format(n=i, i=i) for i in range(items_per_page))
+    return f'<html><body><div id="gs_res_ccl_mid">{items}</div></body></html>'.encode('utf-8')
+
+# What Scholar answers, still with a 200, once it decides the client is a bot
+BLOCK_PAGE = (b'<html><body><div id="gs_captcha_ccl"><h1>Please show you\'re not a robot</h1>'
+              b'<p>Our systems have detected unusual traffic from your computer network.</p>'
+              b'<form id="gs_captcha_f"><div class="g-recaptcha"></div></form></div></body></html>')
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves the same Scholar-like page for every GET, with optional latency and 429s"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = make_page()
+    latency = 0.05
+    throttle_every = 0
+    requests_seen = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            type(self).requests_seen += 1
+            throttled = self.throttle_every and self.requests_seen % self.throttle_every == 0
+        time.sleep(self.latency)
+
+        if throttled:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+@contextlib.contextmanager
+def serve(handler=StandInHandler):
+    """Run handler on an ephemeral localhost port and yield the base URL"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def bench_serial(url, pages):
+    """The old harvest loop: one bare requests.get (and connection) per page"""
+    start = time.perf_counter()
+    for page in range(pages):
+        requests.get(url, params={'start': page * 10}, timeout=10)
+    return pages * 60 / (time.perf_counter() - start)
+
+def bench_fetcher(url, pages, concurrency):
+    jobs = [(url, {'start': page * 10}) for page in range(pages)]
+    start = time.perf_counter()
+    with Fetcher(rate=None, concurrency=concurrency, per_host=concurrency, backoff=0.01) as fetcher, \
+            open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        ok = sum(1 for response in fetcher.fetch_iter(jobs) if response is not None and response.status_code == 200)
+    elapsed = time.perf_counter() - start
+    assert ok == pages, f"only {ok} of {pages} pages fetched"
+    return pages * 60 / elapsed
+
+def bench_prefetch(url, pages, work):
+    """Seconds to consume pages while spending work seconds on each; downloads should hide behind the work"""
+    jobs = [(url, {'start': page * 10}) for page in range(pages)]
+    start = time.perf_counter()
+    with Fetcher(rate=None, concurrency=1, backoff=0.01) as fetcher:
+        for _ in fetcher.fetch_iter(jobs):
+            time.sleep(work)
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    import argparse
+    import harvest
+
+    parser = argparse.ArgumentParser(description='Benchmark the SERP fetcher against a local stand-in server')
+    parser.add_argument('-n', '--pages', type=int, default=100, help='Pages per run (default: 100)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Server latency per request in seconds (default: 0.05)')
+    parser.add_argument('--throttle-every', type=int, default=10,
+                        help='Answer every Nth request with 429 (default: 10, 0 disables)')
+    parser.add_argument('-c', '--concurrency', type=int, nargs='+', default=[1, 4, 8],
+                        help='Concurrency levels to benchmark (default: 1 4 8)')
+    args = parser.parse_args()
+
+    StandInHandler.latency = args.latency
+    with serve() as base_url:
+        url = f"{base_url}/scholar"
+        print(f"serial requests.get       {bench_serial(url, args.pages):8.0f} pages/minute")
+
+        StandInHandler.throttle_every = args.throttle_every
+        for concurrency in args.concurrency:
+            rate = bench_fetcher(url, args.pages, concurrency)
+            print(f"Fetcher concurrency={concurrency:<4}  {rate:8.0f} pages/minute")
+
+        # One request at a time, but the next page downloads while the caller works on this one
+        StandInHandler.throttle_every = 0
+        pages = min(args.pages, 20)
+        elapsed = bench_prefetch(url, pages, args.latency)
+        print(f"prefetch while working     {elapsed:8.2f}s for {pages} pages "
+              f"({pages * 2 * args.latency:.2f}s if fetching waited for the caller)")
+        StandInHandler.throttle_every = args.throttle_every
+
+        # End to end: harvest against the stand-in, with retries absorbing the injected 429s
+        fetcher = Fetcher(rate=None, concurrency=4, per_host=4, backoff=0.01)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            rows = list(harvest.search_google_scholar('test', 50, [url], fetcher))
+        print(f"harvest.search_google_scholar collected {len(rows)} rows from 5 pages")
+
+        # A CAPTCHA page must not be checkpointed as done, or a resumed crawl would skip it for good
+        StandInHandler.throttle_every = 0
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint = Checkpoint('test', tmp_dir)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                    contextlib.redirect_stderr(devnull):
+                StandInHandler.body = BLOCK_PAGE
+                blocked = list(harvest.search_google_scholar('test', 50, [url], fetcher, checkpoint))
+                StandInHandler.body = make_page()
+                resumed = list(harvest.search_google_scholar('test', 50, [url], fetcher, checkpoint))
+            assert not blocked and len(resumed) == 50, f"{len(blocked)} rows while blocked, {len(resumed)} resumed"
+            print(f"blocked crawl recorded no pages; the resumed one collected {len(resumed)} rows")
+        fetcher.close()
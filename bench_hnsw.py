@@ -0,0 +1,121 @@
+import os
+import time
+import resource
+import tempfile
+import itertools
+import numpy as np
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chroma_backend import index_configuration, SPACES
+from embed_cache import EmbeddingCache, EMBED_CACHE, DEFAULT_MODEL
+
+def synthetic_embeddings(count, dim, clusters=64, seed=0):
+    """Unit vectors drawn around random centres, roughly like sentence embeddings of related papers"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim))
+    data = centres[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dim))
+    return (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+def make_queries(data, count, seed=1):
+    """Perturbed copies of random stored vectors"""
+    rng = np.random.default_rng(seed)
+    queries = data[rng.integers(0, len(data), count)] + 0.05 * rng.standard_normal((count, data.shape[1]))
+    return queries.astype(np.float32)
+
+def brute_force(data, queries, k, space):
+    """Exact top-k ids per query with NumPy, using the same distance as the index"""
+    if space == 'cosine':
+        scores = -(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ \
+            (data / np.linalg.norm(data, axis=1, keepdims=True)).T
+    elif space == 'ip':
+        scores = -queries @ data.T
+    else:
+        scores = (queries ** 2).sum(1)[:, None] - 2 * queries @ data.T + (data ** 2).sum(1)[None, :]
+    top = np.argpartition(scores, k, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+def rss_bytes():
+    """Resident memory of this process (Linux), else its peak"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def build(client, data, configuration):
+    """Create a collection holding data and return (collection, seconds)"""
+    collection = client.create_collection(name='bench_hnsw', configuration=configuration, embedding_function=None)
+    batch = client.get_max_batch_size()
+    start = time.perf_counter()
+    for offset in range(0, len(data), batch):
+        collection.add(ids=[str(i) for i in range(offset, min(offset + batch, len(data)))],
+                       embeddings=data[offset:offset + batch])
+    return collection, time.perf_counter() - start
+
+def run_queries(collection, queries, k, truth):
+    """Return (p50 ms, p95 ms, recall@k) over one query per call"""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected & {int(i) for i in found['ids'][0]})
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), hits / (k * len(queries))
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sweep HNSW settings: latency, build time, memory and recall@k')
+    parser.add_argument('-n', '--count', type=int, default=20000, help='Stored vectors (default: 20000)')
+    parser.add_argument('--dim', type=int, default=384, help='Dimensions of synthetic vectors (default: 384)')
+    parser.add_argument('--from-cache', nargs='?', const=EMBED_CACHE,
+                        help=f'Use vectors from an embedding cache instead (default path: {EMBED_CACHE})')
+    parser.add_argument('--model', type=str, default=DEFAULT_MODEL,
+                        help=f'Model whose cached vectors to use (default: {DEFAULT_MODEL})')
+    parser.add_argument('-q', '--queries', type=int, default=200, help='Queries per setting (default: 200)')
+    parser.add_argument('-k', type=int, default=10, help='Results per query (default: 10)')
+    parser.add_argument('--space', choices=SPACES, default='cosine', help='Distance function (default: cosine)')
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32], help='M values (default: 8 16 32)')
+    parser.add_argument('--construction-ef', type=int, nargs='+', default=[100, 200],
+                        help='Build-time ef values (default: 100 200)')
+    parser.add_argument('--search-ef', type=int, nargs='+', default=[10, 50, 100, 200],
+                        help='Query-time ef values (default: 10 50 100 200)')
+    args = parser.parse_args()
+
+    if args.from_cache:
+        data = EmbeddingCache(args.from_cache).vectors(args.model, args.count)
+        if not len(data):
+            raise SystemExit(f"No '{args.model}' vectors in {args.from_cache}")
+    else:
+        data = synthetic_embeddings(args.count, args.dim)
+    queries = make_queries(data, args.queries)
+
+    start = time.perf_counter()
+    truth = brute_force(data, queries, args.k, args.space)
+    print(f"{len(data)} vectors x {data.shape[1]} dims, {len(queries)} queries, "
+          f"NumPy brute force {(time.perf_counter() - start) * 1000 / len(queries):.2f} ms/query")
+    print(f"{'M':>3} {'c_ef':>5} {'s_ef':>5} {'build s':>8} {'mem MB':>7} {'disk MB':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'recall@' + str(args.k):>9}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for index, (m, construction_ef) in enumerate(itertools.product(args.m, args.construction_ef)):
+            path = os.path.join(tmp_dir, str(index))
+            client = chromadb.PersistentClient(path=path)
+            before = rss_bytes()
+            collection, seconds = build(client, data, index_configuration(args.space, m, construction_ef))
+            memory = (rss_bytes() - before) / 1e6
+
+            for search_ef in args.search_ef:
+                collection.modify(configuration={'hnsw': {'ef_search': search_ef}})
+                # A loaded index keeps its ef; reopen the database so the new value is used
+                SharedSystemClient.clear_system_cache()
+                client = chromadb.PersistentClient(path=path)
+                collection = client.get_collection(name='bench_hnsw')
+                p50, p95, recall = run_queries(collection, queries, args.k, truth)
+                print(f"{m:>3} {construction_ef:>5} {search_ef:>5} {seconds:>8.2f} {memory:>7.1f} "
+                      f"{dir_bytes(path) / 1e6:>8.1f} {p50:>7.2f} {p95:>7.2f} {recall:>9.3f}")
+            client.delete_collection(name='bench_hnsw')
@@ -0,0 +1,103 @@
+import os
+import time
+import tempfile
+import contextlib
+import numpy as np
+import chromadb
+from chromadb import EmbeddingFunction
+from chromadb.utils.embedding_functions import register_embedding_function
+from bench_pdf_text import make_fixture_pdfs
+from pdf_text import extract_files
+from upload_pdf import process_pdf, page_documents
+from chroma_ingest import Uploader
+
+@register_embedding_function
+class HashEmbedding(EmbeddingFunction):
+    """Cheap stand-in embedder so the benchmark measures round trips, not a model"""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [np.frombuffer(text.encode('utf-8')[:32].ljust(32, b' '), dtype=np.uint8).astype(np.float32)
+                for text in input]
+
+    @staticmethod
+    def name():
+        return 'bench-hash'
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding()
+
+class RemoteCollection:
+    """Wraps a local collection and sleeps on every write, like a Chroma Cloud round trip"""
+
+    def __init__(self, collection, latency):
+        self.collection = collection
+        self.latency = latency
+
+    def add(self, **kwargs):
+        time.sleep(self.latency)
+        return self.collection.add(**kwargs)
+
+    def upsert(self, **kwargs):
+        time.sleep(self.latency)
+        return self.collection.upsert(**kwargs)
+
+class RemoteClient:
+    def __init__(self, client, latency):
+        self.client = client
+        self.latency = latency
+
+    def get_or_create_collection(self, name, **kwargs):
+        time.sleep(self.latency)
+        return RemoteCollection(self.client.get_or_create_collection(name=name, **kwargs), self.latency)
+
+def bench_per_page(client, paths):
+    """The old upload loop: one collection.add per page"""
+    start = time.perf_counter()
+    pages = 0
+    for pdf_path, file_pages in extract_files(paths):
+        collection_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        collection = client.get_or_create_collection(name=collection_name, embedding_function=HashEmbedding())
+        for doc in page_documents(collection_name, process_pdf(pdf_path, file_pages)):
+            collection.add(documents=[doc["text"]], metadatas=[doc["metadata"]], ids=[doc["id"]])
+            pages += 1
+    return pages, pages, time.perf_counter() - start
+
+def bench_uploader(client, paths, batch_size, workers):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with Uploader(client, batch_size, embedding_function=HashEmbedding()) as uploader:
+            for pdf_path, file_pages in extract_files(paths, workers):
+                collection_name = os.path.splitext(os.path.basename(pdf_path))[0]
+                uploader.submit(collection_name, page_documents(collection_name, process_pdf(pdf_path, file_pages)))
+    return uploader.stats['documents'], uploader.stats['batches'], uploader.stats['seconds']
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark per-page Chroma adds against batched, overlapped uploads')
+    parser.add_argument('-n', '--files', type=int, default=8, help='Fixture PDFs (default: 8)')
+    parser.add_argument('-p', '--pages', type=int, default=40, help='Pages per fixture PDF (default: 40)')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Simulated seconds per Chroma round trip (default: 0.02)')
+    parser.add_argument('-b', '--batch-sizes', type=int, nargs='+', default=[16, 64],
+                        help='Batch sizes to benchmark (default: 16 64)')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Text extraction processes (default: 1)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_fixture_pdfs(tmp_dir, args.files, args.pages)
+        runs = [('per-page add', lambda client: bench_per_page(client, paths))]
+        for batch_size in args.batch_sizes:
+            runs.append((f"Uploader batch={batch_size}",
+                         lambda client, batch_size=batch_size: bench_uploader(client, paths, batch_size, args.workers)))
+
+        for index, (name, run) in enumerate(runs):
+            client = chromadb.PersistentClient(path=os.path.join(tmp_dir, f"chroma_{index}"))
+            pages, round_trips, elapsed = run(RemoteClient(client, args.latency))
+            print(f"{name:20} {pages} pages {round_trips:5} round trips {pages / elapsed:8.1f} pages/sec")
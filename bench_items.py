@@ -0,0 +1,65 @@
+import os
+import time
+import tempfile
+from bs4 import BeautifulSoup
+from gs_parse import PARSER, RECORD_CLASS, extract_item, list_html_files
+from bench_parse import make_fixture_pages
+
+def legacy_extract(item):
+    """The per-field find() extraction the scripts used before gs_parse.extract_item"""
+    title_tag = item.find('h3', class_='gs_rt')
+    title = title_tag.get_text(strip=True) if title_tag else "N/A"
+
+    url_tag = item.find('h3', class_='gs_rt').find('a') if item.find('h3', class_='gs_rt') else None
+    url = url_tag['href'] if url_tag else "N/A"
+
+    pdf_div = item.find('div', class_='gs_or_ggsm')
+    pdf_tag = pdf_div.find('a', href=True) if pdf_div else item.find('a', href=True)
+
+    author_tag = item.find('div', class_='gs_a')
+    author_text = author_tag.get_text(strip=True) if author_tag else "N/A"
+    authors = author_text.split(' - ')[0].strip() if ' - ' in author_text else author_text
+
+    year_tag = item.find('span', class_='gs_fl')
+    year = year_tag.get_text(strip=True).split(' ')[-1].strip() if year_tag else "N/A"
+
+    return title, authors, year, url, pdf_tag['href'] if pdf_tag else None
+
+def load_items(directory):
+    """Parse every page once up front so only item extraction is timed"""
+    items = []
+    for file_path in list_html_files(directory):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            soup = BeautifulSoup(file, PARSER)
+        items.extend(soup.find_all('div', class_=RECORD_CLASS))
+    return items
+
+def bench(extract, items, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            extract(item)
+    return len(items) * rounds / (time.perf_counter() - start)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Micro-benchmark of per-item extraction')
+    parser.add_argument('directory', type=str, nargs='?',
+                        help='Directory of saved pages (default: generate synthetic pages)')
+    parser.add_argument('-n', '--pages', type=int, default=50,
+                        help='Number of synthetic pages to generate (default: 50)')
+    parser.add_argument('-r', '--rounds', type=int, default=5,
+                        help='Passes over the items per measurement (default: 5)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = args.directory
+        if not directory:
+            directory = tmp_dir
+            make_fixture_pages(directory, args.pages)
+        items = load_items(directory)
+
+    print(f"{len(items)} items from {directory}")
+    print(f"legacy find() chain  {bench(legacy_extract, items, args.rounds):10.0f} items/sec")
+    print(f"gs_parse.extract_item {bench(extract_item, items, args.rounds):10.0f} items/sec")
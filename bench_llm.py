@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+import tempfile
+import contextlib
+from http.server import BaseHTTPRequestHandler
+import chromadb
+from langchain_groq import ChatGroq
+from bench_fetch import serve
+from bench_ingest import HashEmbedding
+from gs_llm_collect import METADATA_PROMPT, RULE_FIELDS, extract_metadata_with_llm, update_collections
+from llm_metadata import MetadataExtractor
+from llm_cache import LLMCache
+from metadata_rules import rule_metadata
+
+METADATA = {"Title": "Sample Title", "Author": "John Doe", "Publication": "Journal of Sample Research",
+            "Year": "2023", "Publisher": "Sample Publisher"}
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """Answers Groq's OpenAI-style chat completions endpoint after a fixed latency.
+
+    Batched prompts get a JSON array with one object per "### Paper <id>".
+    Every fail_every-th call fails with a 503 and every garble_every-th
+    batched reply is cut short, as a model running out of tokens would.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.2
+    fail_every = 0
+    garble_every = 0
+    calls = 0
+    batched = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        papers = re.findall(r'^### Paper (\d+)$', request['messages'][-1]['content'], re.MULTILINE)
+        with self.lock:
+            type(self).calls += 1
+            failed = self.fail_every and self.calls % self.fail_every == 0
+            if papers:
+                type(self).batched += 1
+            garbled = papers and self.garble_every and self.batched % self.garble_every == 0
+        time.sleep(self.latency)
+
+        if papers:
+            reply = json.dumps([{"id": paper, **METADATA} for paper in papers], indent=2)
+            reply = reply[:len(reply) // 2] if garbled else reply
+        else:
+            reply = json.dumps(METADATA)
+
+        if failed:
+            body = json.dumps({"error": {"message": "overloaded", "type": "server_error"}}).encode('utf-8')
+            self.send_response(503)
+        else:
+            body = json.dumps({
+                "id": f"chatcmpl-{self.calls}", "object": "chat.completion", "created": int(time.time()),
+                "model": "llama-3.1-8b-instant",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 500, "completion_tokens": 60, "total_tokens": 560}
+            }).encode('utf-8')
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def first_page(index, messy_every=4):
+    """A typeset journal first page, except every messy_every-th paper, which reads like bad OCR"""
+    if messy_every and index % messy_every == 0:
+        return f"a study 0f paper {index}\nj0hn d0e , et al\nj. sample res. 2023; 3: 1-20"
+    return (f"Journal of Sample Research, Vol. 3, No. 2 (2023) pp. 1-20\n"
+            f"https://doi.org/10.1016/j.jsr.2023.{index:05d}\n"
+            f"A Study of Paper {index}\n"
+            f"John Doe1, Jane Roe2 and Ahmad bin Ali1\n"
+            f"1Faculty of Education, Universiti Malaya\n"
+            f"Abstract\nWe study paper {index}.")
+
+# First pages as PDF text extraction lays them out for real publishers, with the title each should give
+PUBLISHER_PAGES = {
+    'Elsevier': ("Computers & Education 168 (2021) 104212\nContents lists available at ScienceDirect\n"
+                 "Computers & Education\njournal homepage: www.elsevier.com/locate/compedu\n"
+                 "Exploring the role of chatbots in secondary school mathematics\n"
+                 "Nur Aisyah Rahman a, Lim Wei Jie b,*\n"
+                 "a Faculty of Education, Universiti Malaya, Kuala Lumpur, Malaysia\n"
+                 "b School of Computing, Universiti Utara Malaysia, Sintok, Malaysia\n"
+                 "A R T I C L E I N F O\nKeywords:\nChatbots",
+                 "Exploring the role of chatbots in secondary school mathematics"),
+    'Springer': ("Education and Information Technologies (2022) 27:1234–1256\n"
+                 "https://doi.org/10.1007/s10639-021-10789-1\n"
+                 "Mobile learning adoption among university students in Malaysia\n"
+                 "Siti Nurhaliza Ahmad1 · Mohd Faizal Hassan2\n"
+                 "Received: 3 May 2021 / Accepted: 10 October 2021 / Published online: 2 November 2021\n"
+                 "© The Author(s), under exclusive licence to Springer Nature 2021\nAbstract",
+                 "Mobile learning adoption among university students in Malaysia"),
+    'Taylor & Francis': ("INTERACTIVE LEARNING ENVIRONMENTS\n2023, VOL. 31, NO. 4, 2145–2160\n"
+                         "https://doi.org/10.1080/10494820.2021.1875001\n"
+                         "Gamification and student engagement in online courses\n"
+                         "Ahmad Zaki Hassan a and Mary Smith b\n"
+                         "aFaculty of Computing, Universiti Teknologi Malaysia, Johor, Malaysia\nABSTRACT",
+                         "Gamification and student engagement in online courses"),
+    'arXiv': ("arXiv:2105.01234v2 [cs.CL] 12 May 2021\n"
+              "Attention Is Not All You Need for Low-Resource Translation\n"
+              "Wei Zhang1, Priya Natarajan2, and Tom Becker1\n1Google Research\n2University of Toronto\nAbstract",
+              "Attention Is Not All You Need for Low-Resource Translation"),
+    'MDPI': ("education sciences\nArticle\nTeachers’ Digital Competence in Post-Pandemic Classrooms\n"
+             "Maria Lopez 1,*, Kamal Hussein 2 and Anna Novak 1\n"
+             "1 Department of Education, University of Lisbon, Portugal\n"
+             "Citation: Lopez, M.; Hussein, K.; Novak, A. Educ. Sci. 2022, 12, 345. "
+             "https://doi.org/10.3390/educsci12050345\nAbstract:",
+             "Teachers’ Digital Competence in Post-Pandemic Classrooms"),
+    'Book chapter': ("Chapter 3\nTeaching Online During the Pandemic\nAhmad Bin Ali, Siti Aminah\n"
+                     "© The Author(s), under exclusive license to Springer Nature Singapore Pte Ltd. (2022)\n"
+                     "Abstract This chapter reports on teachers moving their classes online.",
+                     "Teaching Online During the Pandemic"),
+}
+
+def check_rules():
+    """Rule titles for PUBLISHER_PAGES; a wrong one at the threshold would skip the LLM, so it fails the run"""
+    for publisher, (text, expected) in PUBLISHER_PAGES.items():
+        title = rule_metadata(text).get('Title')
+        outcome = 'ok' if title == expected else 'left to the LLM' if title is None else f'WRONG: {title!r}'
+        print(f"{'rules ' + publisher:20} {outcome}")
+        assert title in (None, expected), f"{publisher} first page gave a wrong title at the threshold: {title!r}"
+
+def make_collections(client, count):
+    """One small collection per fake paper, with a first page to extract metadata from"""
+    for index in range(count):
+        collection = client.get_or_create_collection(name=f"paper_{index:04d}", embedding_function=HashEmbedding())
+        collection.add(ids=[f"paper_{index:04d}_page_1", f"paper_{index:04d}_page_2"],
+                       documents=[first_page(index), "Body text"],
+                       metadatas=[{"page_number": 1}, {"page_number": 2}])
+    return [f"paper_{index:04d}" for index in range(count)]
+
+def make_llm(base_url):
+    """A ChatGroq pointed at the fake server; its async HTTP pool belongs to one event loop, so make one per run"""
+    # Retries are the engine's job, so the SDK's own are turned off
+    return ChatGroq(model_name="llama-3.1-8b-instant", temperature=0, max_tokens=1000,
+                    api_key="fake", base_url=base_url, max_retries=0)
+
+def bench_serial(client, names, llm):
+    """The old gs_llm_collect loop: one blocking invoke per collection, one update per document"""
+    start = time.perf_counter()
+    for name in names:
+        col = client.get_collection(name=name)
+        results = col.get(where={"page_number": 1})
+        metadata = extract_metadata_with_llm(results['documents'][0], llm)
+        for i in range(len(results['documents'])):
+            col.update(documents=results['documents'][i], metadatas=[{**results['metadatas'][i], **metadata}],
+                       ids=results['ids'][i])
+    return time.perf_counter() - start
+
+def bench_engine(client, names, llm, concurrency, cache=None, batch_size=1, required=None):
+    extractor = MetadataExtractor(llm, METADATA_PROMPT, concurrency=concurrency, backoff=0.1, cache=cache,
+                                  batch_size=batch_size, required=required)
+    async def run():
+        try:
+            return await update_collections(client, names, extractor)
+        finally:
+            # Close the SDK's HTTP pool on this loop, not when it is garbage collected after the loop is gone
+            await llm.async_client._client.close()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(None):
+        results = asyncio.run(run())
+    assert all(results), f"{results.count(False)} collections failed"
+    return time.perf_counter() - start, extractor.stats
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark LLM metadata extraction against a fake Groq server')
+    parser.add_argument('-n', '--collections', type=int, default=40, help='Collections to process (default: 40)')
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds per LLM call (default: 0.2)')
+    parser.add_argument('--fail-every', type=int, default=10,
+                        help='Fail every Nth call with a 503 to exercise retries (default: 10, 0 disables)')
+    parser.add_argument('-c', '--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help='Concurrency levels to benchmark (default: 1 4 16)')
+    parser.add_argument('--llm-batch', type=int, nargs='+', default=[4, 8],
+                        help='First pages per request to benchmark at the highest concurrency (default: 4 8)')
+    parser.add_argument('--garble-every', type=int, default=5,
+                        help='Cut every Nth batched reply short to exercise splitting (default: 5, 0 disables)')
+    args = parser.parse_args()
+
+    check_rules()
+
+    FakeGroqHandler.latency = args.latency
+    with serve(FakeGroqHandler) as base_url:
+        client = chromadb.EphemeralClient()
+        names = make_collections(client, args.collections)
+
+        elapsed = bench_serial(client, names, make_llm(base_url))
+        print(f"{'serial invoke':20} {len(names) / elapsed:7.1f} collections/sec")
+
+        FakeGroqHandler.fail_every = args.fail_every
+        for concurrency in args.concurrency:
+            elapsed, stats = bench_engine(client, names, make_llm(base_url), concurrency)
+            print(f"{'async c=' + str(concurrency):20} {len(names) / elapsed:7.1f} collections/sec "
+                  f"({stats['calls']} LLM requests, {stats['retries']} retried)")
+
+        # Fewer requests for the same papers is what counts against a requests-per-minute limit
+        FakeGroqHandler.garble_every = args.garble_every
+        concurrency = max(args.concurrency)
+        for batch_size in args.llm_batch:
+            elapsed, stats = bench_engine(client, names, make_llm(base_url), concurrency, batch_size=batch_size)
+            print(f"{'batch ' + str(batch_size) + ' c=' + str(concurrency):20} {len(names) / elapsed:7.1f} "
+                  f"collections/sec ({stats['calls']} LLM requests, {stats['splits']} split, "
+                  f"{stats['retries']} retried)")
+        FakeGroqHandler.garble_every = 0
+
+        # Only the messy first pages should still need the LLM
+        elapsed, stats = bench_engine(client, names, make_llm(base_url), concurrency, required=RULE_FIELDS)
+        print(f"{'rules c=' + str(concurrency):20} {len(names) / elapsed:7.1f} collections/sec "
+              f"({stats['calls']} LLM requests, {stats['rules']} read by rules alone)")
+
+        # A re-run answered from the LLM cache should make no calls at all
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = LLMCache(os.path.join(tmp_dir, 'llm_cache.sqlite'))
+            for label in ('cold LLM cache', 'warm LLM cache'):
+                calls = FakeGroqHandler.calls
+                elapsed, stats = bench_engine(client, names, make_llm(base_url), concurrency, cache)
+                print(f"{label:20} {len(names) / elapsed:7.1f} collections/sec "
+                      f"({FakeGroqHandler.calls - calls} LLM requests)")
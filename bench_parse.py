@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import gs_scholar
+import gs_extract_page
+from gs_parse import list_html_files, map_files
+
+ITEM_TEMPLATE = '''
+<div class="gs_r gs_or gs_scl" data-cid="cid{n}" data-did="did{n}" data-lid="" data-rp="{i}">
+  <div class="gs_ggs gs_fl"><div class="gs_ggsd"><div class="gs_or_ggsm" ontouchstart="gs_evt_dsp(event)" tabindex="-1">
+    <a href="https://repository.example.org/bitstream/{n}/paper_{n}.pdf" data-clk="hl=en&amp;sa=T&amp;oi=gga"><span class="gs_ctg2">[PDF]</span> example.org</a>
+  </div></div></div>
+  <div class="gs_ri">
+    <h3 class="gs_rt" ontouchstart="gs_evt_dsp(event)"><a id="a{n}" href="https://journal.example.org/doi/abs/10.1000/{n}" data-clk="hl=en&amp;sa=T">Exploring <b>ChatGPT</b> in education: study number {n}</a></h3>
+    <div class="gs_a">GK Ming, M Mansor - Journal of Research in Education and Social Sciences, 2023 - example.org</div>
+    <div class="gs_rs">This study examines the impact of <b>ChatGPT</b> on student learning outcomes and teacher professional development across several institutions ...</div>
+    <div class="gs_fl gs_flb"><a href="javascript:void(0)" class="gs_or_sav gs_or_btn" role="button">Save</a> <a href="javascript:void(0)" class="gs_or_cit gs_or_btn" role="button">Cite</a> <a href="/scholar?cites={n}&amp;as_sdt=2005">Cited by {i}</a> <a href="/scholar?q=related:{n}:scholar.google.com/">Related articles</a> <span class="gs_fl">Published 2023</span></div>
+  </div>
+</div>'''
+
+PAGE_TEMPLATE = '''<!doctype html><html><head><title>Google Scholar</title>
+<style>{style}</style><script>{script}</script></head>
+<body><div id="gs_top"><div id="gs_hdr">{header}</div>
+<div id="gs_bdy"><div id="gs_bdy_sb">{sidebar}</div>
+<div id="gs_res_ccl_mid">{items}</div></div>
+<div id="gs_ftr">{footer}</div></div></body></html>'''
+
+def make_fixture_pages(directory, count, items_per_page=10):
+    """Write count synthetic Google Scholar result pages into directory"""
+    filler = '<a href="/scholar?as_ylo=2020">Since 2020</a> ' * 40
+    for page in range(count):
+        items = ''.join(ITEM_TEMPLATE.format(n=page * items_per_page + i, i=i) for i in range(items_per_page))
+        html = PAGE_TEMPLATE.format(style='.gs_r{margin:0}' * 400, script='var gs_js=1;' * 400,
+                                    header=filler, sidebar=filler, items=items, footer=filler)
+        with open(os.path.join(directory, f"{page + 1}.html"), 'w', encoding='utf-8') as file:
+            file.write(html)
+
+def bench(parse_file, directory, workers):
+    """Return pages/sec for parsing every page in directory with parse_file.
+
+    Goes through map_files rather than process_html_files, so every run parses
+    every page and no manifest is read from or written into directory.
+    """
+    html_files = list_html_files(directory)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for _ in map_files(parse_file, html_files, workers):
+            pass
+        elapsed = time.perf_counter() - start
+    return len(html_files) / elapsed
+
+if __name__ == '__main__':
+    import argparse
+    from gs_parse import PARSER
+
+    parser = argparse.ArgumentParser(description='Benchmark parallel parsing of Google Scholar pages')
+    parser.add_argument('directory', type=str, nargs='?',
+                        help='Directory of saved pages (default: generate synthetic pages)')
+    parser.add_argument('-n', '--pages', type=int, default=400,
+                        help='Number of synthetic pages to generate (default: 400)')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 4, 8],
+                        help='Worker counts to benchmark (default: 1 4 8)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = os.path.abspath(args.directory) if args.directory else None
+        if not directory:
+            directory = os.path.join(tmp_dir, 'pages')
+            os.makedirs(directory)
+            make_fixture_pages(directory, args.pages)
+
+        print(f"Parser backend: {PARSER}, CPUs: {os.cpu_count()}")
+        for name, module in [('gs_scholar', gs_scholar), ('gs_extract_page', gs_extract_page)]:
+            for workers in args.workers:
+                rate = bench(module.parse_file, directory, workers)
+                print(f"{name:16} workers={workers:<3} {rate:8.1f} pages/sec")
+                sys.stdout.flush()
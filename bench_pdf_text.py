@@ -0,0 +1,76 @@
+import os
+import time
+import tempfile
+import contextlib
+from pdf_text import extract_files
+
+WORDS = ('generative models reshape assessment practice while students report mixed '
+         'perceptions of feedback quality and academic integrity across institutions').split()
+
+def make_pdf(path, pages, lines_per_page=45):
+    """Write a plain-text PDF with the given number of pages (no third-party writer needed)"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for page in range(pages):
+        lines = []
+        for line in range(lines_per_page):
+            words = ' '.join(WORDS[(page + line + i) % len(WORDS)] for i in range(12))
+            lines.append(f"({words}) Tj T*")
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {' '.join(lines)} ET".encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id)
+        kids.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), pages)
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    with open(path, 'wb') as file:
+        file.write(out)
+
+def make_fixture_pdfs(directory, files, pages, big_pages=0):
+    """Write files PDFs of pages pages each, plus one big_pages-page volume if requested"""
+    paths = []
+    for index in range(files):
+        paths.append(os.path.join(directory, f"paper_{index}.pdf"))
+        make_pdf(paths[-1], pages)
+    if big_pages:
+        paths.append(os.path.join(directory, 'proceedings.pdf'))
+        make_pdf(paths[-1], big_pages)
+    return paths
+
+def bench(paths, workers):
+    """Return pages/sec for extracting every page of paths"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        pages = sum(1 for _, file_pages in extract_files(paths, workers) for _ in file_pages)
+        elapsed = time.perf_counter() - start
+    return pages, pages / elapsed
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark PDF text extraction against worker count')
+    parser.add_argument('-n', '--files', type=int, default=16, help='Fixture PDFs (default: 16)')
+    parser.add_argument('-p', '--pages', type=int, default=12, help='Pages per fixture PDF (default: 12)')
+    parser.add_argument('--big', type=int, default=200,
+                        help='Pages in one extra large PDF, split across workers (default: 200, 0 disables)')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Worker counts to benchmark (default: 1 2 4 8)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_fixture_pdfs(tmp_dir, args.files, args.pages, args.big)
+        print(f"{len(paths)} PDFs, CPUs: {os.cpu_count()}")
+        for workers in args.workers:
+            pages, rate = bench(paths, workers)
+            print(f"workers={workers:<3} {pages} pages {rate:8.1f} pages/sec")
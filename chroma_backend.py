@@ -0,0 +1,145 @@
+import os
+import chromadb
+
+BACKENDS = ('cloud', 'local', 'memory')
+SPACES = ('cosine', 'l2', 'ip')
+
+# Where the local backend keeps its embedded database
+LOCAL_PATH = '.chroma'
+
+# Documents per round trip when copying collections between backends
+SYNC_BATCH = 256
+
+def get_client(backend=None, path=None):
+    """Return a Chroma client for backend.
+
+    'cloud' is Chroma Cloud from CHROMA_API_KEY / CHROMA_TENANT / CHROMA_DATABASE,
+    'local' an embedded PersistentClient at path, and 'memory' an EphemeralClient.
+    backend defaults to CHROMA_BACKEND, then 'cloud'; path to CHROMA_PATH, then .chroma.
+    """
+    backend = backend or os.getenv('CHROMA_BACKEND') or 'cloud'
+
+    if backend == 'cloud':
+        # Get Chroma Cloud credentials
+        ch_api_key = os.getenv('CHROMA_API_KEY')
+        ch_tenant = os.getenv('CHROMA_TENANT')
+        ch_database = os.getenv('CHROMA_DATABASE')
+
+        if not all([ch_api_key, ch_tenant, ch_database]):
+            raise ValueError("Missing Chroma Cloud credentials in environment variables")
+
+        return chromadb.CloudClient(
+            tenant=ch_tenant,
+            database=ch_database,
+            api_key=ch_api_key
+        )
+    if backend == 'local':
+        return chromadb.PersistentClient(path=path or os.getenv('CHROMA_PATH') or LOCAL_PATH)
+    if backend == 'memory':
+        return chromadb.EphemeralClient()
+    raise ValueError(f"Unknown Chroma backend '{backend}' (expected one of: {', '.join(BACKENDS)})")
+
+def add_backend_arguments(parser):
+    """Add --backend and --chroma-path to an argparse parser"""
+    parser.add_argument('--backend', choices=BACKENDS,
+                        help='Chroma backend: cloud, local or memory (default: $CHROMA_BACKEND or cloud)')
+    parser.add_argument('--chroma-path', type=str,
+                        help=f'Database directory for the local backend (default: $CHROMA_PATH or {LOCAL_PATH})')
+
+def index_configuration(space=None, m=None, construction_ef=None, search_ef=None):
+    """Collection configuration for the HNSW index, or None to keep Chroma's defaults.
+
+    space is the distance function, m the neighbours kept per node, and the
+    ef values trade build/query time for recall. Settings left as None keep
+    their defaults.
+    """
+    hnsw = {key: value for key, value in (('space', space), ('max_neighbors', m),
+                                          ('ef_construction', construction_ef), ('ef_search', search_ef))
+            if value is not None}
+    return {'hnsw': hnsw} if hnsw else None
+
+def collection_index(collection):
+    """index_configuration with the HNSW settings of an existing collection"""
+    hnsw = (collection.configuration or {}).get('hnsw') or {}
+    return index_configuration(hnsw.get('space'), hnsw.get('max_neighbors'), hnsw.get('ef_construction'),
+                               hnsw.get('ef_search'))
+
+def add_index_arguments(parser):
+    """Add the HNSW index options used when collections are created"""
+    parser.add_argument('--hnsw-space', choices=SPACES, help='Distance function for new collections (default: l2)')
+    parser.add_argument('--hnsw-m', type=int, help='HNSW neighbours per node, M (default: 16)')
+    parser.add_argument('--hnsw-construction-ef', type=int, help='HNSW ef at build time (default: 100)')
+    parser.add_argument('--hnsw-search-ef', type=int, help='HNSW ef at query time (default: 100)')
+
+def index_from_args(args):
+    return index_configuration(args.hnsw_space, args.hnsw_m, args.hnsw_construction_ef, args.hnsw_search_ef)
+
+def sync_collection(source, target, batch_size=SYNC_BATCH, rewrite=None):
+    """Copy every document of source into target, stored embeddings included; return how many.
+
+    Documents are read and upserted batch_size at a time, so nothing is
+    embedded again and re-running an interrupted copy is safe. rewrite, if
+    given, maps each batch's (ids, metadatas) to the ones written to target.
+    """
+    copied = 0
+    offset = 0
+    while True:
+        page = source.get(include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=offset)
+        if not page["ids"]:
+            break
+        ids, metadatas = rewrite(page["ids"], page["metadatas"]) if rewrite else (page["ids"], page["metadatas"])
+        target.upsert(ids=ids, documents=page["documents"], metadatas=metadatas, embeddings=page["embeddings"])
+        copied += len(page["ids"])
+        if len(page["ids"]) < batch_size:
+            break
+        offset += batch_size
+    return copied
+
+def sync(source_client, target_client, names=None, batch_size=SYNC_BATCH, index=None):
+    """Copy collections (all of them by default) from one backend to another.
+
+    New target collections get the source collection's HNSW settings, with
+    any set in index (see index_configuration) taking precedence.
+    """
+    from corpus import existing_collection_names
+    names = sorted(names or existing_collection_names(source_client))
+
+    print(f"Syncing {len(names)} collections")
+
+    total = 0
+    for idx, name in enumerate(names, 1):
+        try:
+            source = source_client.get_collection(name=name)
+            hnsw = {**(collection_index(source) or {}).get('hnsw', {}), **(index or {}).get('hnsw', {})}
+            kwargs = {'configuration': {'hnsw': hnsw}} if hnsw else {}
+            copied = sync_collection(source, target_client.get_or_create_collection(name=name, **kwargs), batch_size)
+            total += copied
+            print(f"✅ '{name}': {copied} documents ({idx}/{len(names)})")
+        except Exception as e:
+            print(f"❌ Error syncing collection '{name}': {str(e)}")
+            continue
+
+    print(f"Synced {total} documents")
+    return total
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description='Copy Chroma collections between backends, e.g. a local bulk run to cloud')
+    parser.add_argument('--from', dest='source', choices=BACKENDS, default='local',
+                        help='Backend to read from (default: local)')
+    parser.add_argument('--to', dest='target', choices=BACKENDS, default='cloud',
+                        help='Backend to write to (default: cloud)')
+    parser.add_argument('--chroma-path', type=str,
+                        help=f'Database directory for the local backend (default: $CHROMA_PATH or {LOCAL_PATH})')
+    parser.add_argument('-c', '--collections', nargs='+', help='Only these collections (default: all)')
+    parser.add_argument('-b', '--batch-size', type=int, default=SYNC_BATCH,
+                        help=f'Documents per round trip (default: {SYNC_BATCH})')
+    add_index_arguments(parser)
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv()
+    sync(get_client(args.source, args.chroma_path), get_client(args.target, args.chroma_path),
+         args.collections, args.batch_size, index_from_args(args))
@@ -0,0 +1,221 @@
+import os
+import time
+import queue
+import threading
+from corpus import corpus_sources, existing_collection_names
+from chunker import join_chunks
+
+# Documents (pages or chunks) per collection.add call, and the most document text one call may carry
+BATCH_SIZE = 64
+MAX_BATCH_BYTES = 4 << 20
+
+# Rough tokens-per-byte for English text; keeps a batch under the embedder's limits
+BYTES_PER_TOKEN = 4
+
+# Records read and rewritten per round trip by metadata-only updates
+UPDATE_BATCH = 1000
+
+def batch_documents(docs, batch_size=BATCH_SIZE, max_bytes=MAX_BATCH_BYTES, max_tokens=None):
+    """Yield lists of docs holding at most batch_size docs and max_bytes of text.
+
+    max_tokens, if given, is an extra ceiling estimated from the text size.
+    A single doc larger than the ceiling is still sent, on its own.
+    """
+    if max_tokens:
+        max_bytes = min(max_bytes, max_tokens * BYTES_PER_TOKEN)
+    batch, size = [], 0
+    for doc in docs:
+        doc_size = len((doc["text"] or "").encode('utf-8'))
+        if batch and (len(batch) >= batch_size or size + doc_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(doc)
+        size += doc_size
+    if batch:
+        yield batch
+
+class Uploader:
+    """Writes documents to Chroma in batches on a background thread.
+
+    submit() hands a file's documents ({"id", "text", "metadata"} dicts) to a
+    bounded queue and returns once they are queued, so PDF extraction keeps
+    running while earlier batches upload. When the queue is full, submit()
+    blocks until the upload thread catches up, which bounds memory.
+
+    With an Embedder, vectors are computed (or read from its cache) on the
+    upload thread and passed to Chroma as embeddings=. configuration (see
+    chroma_backend.index_configuration) applies to collections it creates.
+    """
+
+    def __init__(self, client, batch_size=BATCH_SIZE, max_bytes=MAX_BATCH_BYTES, max_tokens=None,
+                 queue_size=4, upsert=False, embedding_function=None, embedder=None, configuration=None):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.upsert = upsert
+        self.embedder = embedder
+        self.configuration = configuration
+        # Collections get the embedder's function so query_texts match the stored vectors
+        self.embedding_function = embedding_function or (embedder.embedding_function if embedder else None)
+        self.collections = {}
+        self.stats = {'documents': 0, 'batches': 0, 'failed': 0, 'discarded': 0, 'seconds': 0.0}
+        self.errors = {}
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def collection(self, name):
+        if name not in self.collections:
+            kwargs = {'embedding_function': self.embedding_function} if self.embedding_function else {}
+            if self.configuration:
+                # Index settings only take effect when the collection is first created
+                kwargs['configuration'] = self.configuration
+            self.collections[name] = self.client.get_or_create_collection(name=name, **kwargs)
+        return self.collections[name]
+
+    def submit(self, collection_name, docs):
+        """Queue docs for collection_name in batches and return how many were queued.
+
+        If docs raises part way through (a file that can't be read to the end),
+        the batches already queued are removed again and the error re-raised,
+        so a partial file is never left looking uploaded.
+        """
+        ids = []
+        try:
+            for batch in batch_documents(docs, self.batch_size, self.max_bytes, self.max_tokens):
+                self.queue.put((collection_name, batch))
+                ids.extend(doc["id"] for doc in batch)
+        except Exception:
+            if ids:
+                self.queue.put((collection_name, None, ids))
+            raise
+        return len(ids)
+
+    def _discard(self, collection_name, ids):
+        """Delete ids written for a file that failed part way, and its collection if nothing else is in it"""
+        try:
+            collection = self.collection(collection_name)
+            collection.delete(ids=ids)
+            if not collection.count():
+                self.client.delete_collection(name=collection_name)
+                self.collections.pop(collection_name, None)
+        except Exception as e:
+            print(f"❌ Error removing a partial upload from '{collection_name}': {str(e)}")
+        self.stats['discarded'] += len(ids)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            collection_name, batch, *discard = job
+            if batch is None:
+                self._discard(collection_name, *discard)
+                continue
+            try:
+                collection = self.collection(collection_name)
+                write = collection.upsert if self.upsert else collection.add
+                documents = [doc["text"] for doc in batch]
+                kwargs = {'embeddings': self.embedder.embed(documents)} if self.embedder else {}
+                write(
+                    ids=[doc["id"] for doc in batch],
+                    documents=documents,
+                    metadatas=[doc["metadata"] for doc in batch],
+                    **kwargs
+                )
+                self.stats['documents'] += len(batch)
+            except Exception as e:
+                self.stats['failed'] += len(batch)
+                if collection_name not in self.errors:
+                    print(f"❌ Error uploading to '{collection_name}': {str(e)}")
+                self.errors[collection_name] = str(e)
+            self.stats['batches'] += 1
+
+    def close(self):
+        """Wait for queued batches to upload, print a summary and return the stats"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.stats['seconds'] = time.perf_counter() - self.started
+        rate = self.stats['documents'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+        print(f"Uploaded {self.stats['documents']} documents in {self.stats['batches']} round trips "
+              f"({self.stats['seconds']:.1f}s, {rate:.1f} documents/sec, {self.stats['failed']} failed)")
+        if self.stats['discarded']:
+            print(f"Removed {self.stats['discarded']} documents of files that could not be read to the end")
+        if self.embedder:
+            print(f"Embedded {self.embedder.stats['embedded']} texts locally, "
+                  f"{self.embedder.stats['cached']} from the embedding cache")
+        return self.stats
+
+def update_metadata(collection, metadata, where=None, batch_size=UPDATE_BATCH):
+    """Merge metadata into every record of collection (or those matching where); return how many were updated.
+
+    Only ids and metadatas are read and written, so no document text crosses
+    the wire and nothing is embedded again. Every matching id is read before
+    the first write, so where may select on fields that metadata changes.
+    """
+    records = []
+    offset = 0
+    while True:
+        page = collection.get(where=where, include=["metadatas"], limit=batch_size, offset=offset)
+        records.extend(zip(page["ids"], page["metadatas"]))
+        if len(page["ids"]) < batch_size:
+            break
+        offset += batch_size
+
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        collection.update(ids=[record_id for record_id, _ in batch],
+                          metadatas=[{**(existing or {}), **metadata} for _, existing in batch])
+    return len(records)
+
+def first_pages(collection, page_size=UPDATE_BATCH):
+    """{source_file: (text, ids, metadatas)} for the first page of every paper in collection.
+
+    A corpus collection holds many papers, so page-1 records are grouped by
+    source_file and each paper's chunks are joined back into its page text.
+    Records without a source_file are grouped under None.
+    """
+    records = {}
+    offset = 0
+    while True:
+        page = collection.get(where={"page_number": 1}, include=["documents", "metadatas"],
+                              limit=page_size, offset=offset)
+        for record in zip(page["ids"], page["documents"], page["metadatas"]):
+            records.setdefault((record[2] or {}).get("source_file"), []).append(record)
+        if len(page["ids"]) < page_size:
+            break
+        offset += page_size
+
+    return {source: (join_chunks([document for _, document, _ in paper], [metadata for _, _, metadata in paper]),
+                     [record_id for record_id, _, _ in paper], [metadata for _, _, metadata in paper])
+            for source, paper in records.items()}
+
+def plan_ingest(client, pdf_dir, corpus=None, shards=1):
+    """Return (pending, skipped): paths of PDFs in pdf_dir with no collection yet, and how many were skipped.
+
+    Collections are listed once up front, so re-running over a large folder
+    only pays for the files that are new. With a corpus name, a PDF counts as
+    done once its pages are in the corpus collection(s) instead.
+    """
+    if corpus:
+        existing = {os.path.splitext(source)[0] for source in corpus_sources(client, corpus, shards)}
+    else:
+        existing = existing_collection_names(client)
+    pending, skipped = [], 0
+    for pdf_file in sorted(os.listdir(pdf_dir)):
+        if not pdf_file.endswith('.pdf'):
+            continue
+        if os.path.splitext(pdf_file)[0] in existing:
+            skipped += 1
+        else:
+            pending.append(os.path.join(pdf_dir, pdf_file))
+    return pending, skipped
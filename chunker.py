@@ -0,0 +1,85 @@
+import tiktoken
+
+# Same encoder the query scripts use to budget Groq prompts
+ENCODING = 'cl100k_base'
+
+# Tokens per chunk, and how many tokens consecutive chunks share
+CHUNK_TOKENS = 400
+OVERLAP_TOKENS = 50
+
+_encoder = None
+
+def get_encoder():
+    """Load the cl100k_base encoder once, on first use"""
+    global _encoder
+    if _encoder is None:
+        _encoder = tiktoken.get_encoding(ENCODING)
+    return _encoder
+
+def chunk_text(text, chunk_tokens=CHUNK_TOKENS, overlap=OVERLAP_TOKENS, encoder=None):
+    """Yield (start_char, end_char, token_count) windows of chunk_tokens tokens over text.
+
+    Consecutive windows share overlap tokens. Offsets index into text, so
+    text[start_char:end_char] is the chunk.
+    """
+    if overlap >= chunk_tokens:
+        raise ValueError(f"overlap ({overlap}) must be smaller than chunk_tokens ({chunk_tokens})")
+    if not text:
+        return
+    encoder = encoder or get_encoder()
+    tokens = encoder.encode(text, disallowed_special=())
+    _, offsets = encoder.decode_with_offsets(tokens)
+
+    step = chunk_tokens - overlap
+    for start in range(0, len(tokens), step):
+        stop = min(start + chunk_tokens, len(tokens))
+        start_char = offsets[start]
+        end_char = offsets[stop] if stop < len(tokens) else len(text)
+        if end_char > start_char:
+            yield start_char, end_char, stop - start
+        if stop == len(tokens):
+            return
+
+def chunk_documents(collection_name, docs, chunk_tokens=CHUNK_TOKENS, overlap=OVERLAP_TOKENS, encoder=None):
+    """Split page documents into chunk documents with ids and offsets.
+
+    Each chunk keeps its page's metadata and adds chunk_index, start_char,
+    end_char and token_count; word_count is the chunk's own. Ids look like
+    {collection}_page_{n}_chunk_{k}.
+    """
+    for doc in docs:
+        page_number = doc["metadata"]["page_number"]
+        windows = chunk_text(doc["text"], chunk_tokens, overlap, encoder)
+        for index, (start_char, end_char, token_count) in enumerate(windows):
+            text = doc["text"][start_char:end_char]
+            yield {
+                "id": f"{collection_name}_page_{page_number}_chunk_{index}",
+                "text": text,
+                "metadata": {
+                    **doc["metadata"],
+                    "word_count": len(text.split()),
+                    "chunk_index": index,
+                    "start_char": start_char,
+                    "end_char": end_char,
+                    "token_count": token_count
+                }
+            }
+
+def join_chunks(documents, metadatas):
+    """Rebuild a page's text from its chunk documents, given in any order.
+
+    Chunks are put back in chunk_index order and the text they share with the
+    previous chunk is dropped; unchunked pages come back as they are.
+    """
+    chunks = sorted(zip(documents, metadatas), key=lambda chunk: (chunk[1] or {}).get("chunk_index", 0))
+    text = ""
+    end = None
+    for document, metadata in chunks:
+        metadata = metadata or {}
+        if end is not None and "start_char" in metadata:
+            document = document[max(0, end - metadata["start_char"]):]
+        elif text:
+            document = "\n" + document
+        text += document
+        end = metadata.get("end_char")
+    return text
@@ -0,0 +1,79 @@
+import os
+import hashlib
+
+# Name of the single collection (or shard prefix) holding every paper
+CORPUS_NAME = 'corpus'
+
+def corpus_settings():
+    """(name, shards) from CHROMA_CORPUS / CHROMA_CORPUS_SHARDS; name is None for per-PDF collections"""
+    return os.getenv('CHROMA_CORPUS') or None, int(os.getenv('CHROMA_CORPUS_SHARDS') or 1)
+
+def shard_names(name=CORPUS_NAME, shards=1):
+    if shards <= 1:
+        return [name]
+    return [f"{name}_{index:02d}" for index in range(shards)]
+
+def shard_for(source_file, name=CORPUS_NAME, shards=1):
+    """Collection that holds source_file; stable across runs and machines"""
+    names = shard_names(name, shards)
+    return names[int(hashlib.sha256(source_file.encode('utf-8')).hexdigest(), 16) % len(names)]
+
+def existing_collection_names(client, page_size=1000):
+    """Names of every collection in the database, listed page by page"""
+    names = set()
+    offset = 0
+    while True:
+        page = client.list_collections(limit=page_size, offset=offset)
+        names.update(col.name for col in page)
+        if len(page) < page_size:
+            return names
+        offset += page_size
+
+def corpus_sources(client, name=CORPUS_NAME, shards=1, page_size=1000):
+    """source_file of every paper already in the corpus.
+
+    Only first-page documents are read, and only their metadata.
+    """
+    sources = set()
+    existing = existing_collection_names(client, page_size)
+    for shard in shard_names(name, shards):
+        if shard not in existing:
+            continue
+        collection = client.get_collection(name=shard)
+        offset = 0
+        while True:
+            page = collection.get(where={"page_number": 1}, include=["metadatas"], limit=page_size, offset=offset)
+            sources.update(metadata.get("source_file") for metadata in page["metadatas"])
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+    sources.discard(None)
+    return sources
+
+def query_corpus(client, text, n_results, name=CORPUS_NAME, shards=1, where=None):
+    """Run one ANN search per shard and return the n_results nearest hits overall.
+
+    Results use the same shape as the per-collection queries, with the
+    paper's collection name taken from its source_file. where filters on
+    metadata, e.g. {"source_file": "paper.pdf"} or {"Year": "2023"}.
+    Shards that don't exist yet hold no papers and are skipped.
+    """
+    hits = []
+    existing = existing_collection_names(client)
+    for shard in shard_names(name, shards):
+        if shard not in existing:
+            continue
+        found = client.get_collection(name=shard).query(
+            query_texts=[text],
+            n_results=n_results,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        for doc, metadata, distance in zip(found['documents'][0], found['metadatas'][0], found['distances'][0]):
+            hits.append((distance, {
+                'collection': os.path.splitext(metadata.get('source_file') or shard)[0],
+                'document': doc,
+                'metadata': metadata
+            }))
+    hits.sort(key=lambda hit: hit[0])
+    return [result for _, result in hits[:n_results]]
@@ -0,0 +1,110 @@
+import json
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+
+EMBED_CACHE = '.embed_cache.sqlite'
+
+# What Chroma's DefaultEmbeddingFunction runs (ONNX, on CPU)
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+
+# Texts per call into the embedding model
+EMBED_BATCH = 256
+
+def text_sha256(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+def model_key(embedding_function):
+    """Cache key for a Chroma embedding function: its name() plus a hash of its get_config().
+
+    name() only identifies the class, so two functions of one class set up
+    with different models or options would otherwise share cached vectors.
+    """
+    try:
+        config = embedding_function.get_config()
+    except NotImplementedError:
+        raise ValueError(f"Embedding function '{embedding_function.name()}' has no get_config(); "
+                         f"pass model= to name what it embeds with") from None
+    if not config:
+        return embedding_function.name()
+    return f"{embedding_function.name()}:{text_sha256(json.dumps(config, sort_keys=True, default=str))[:16]}"
+
+class EmbeddingCache:
+    """SQLite store of float32 vectors keyed by model name and text SHA-256"""
+
+    def __init__(self, path=EMBED_CACHE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS vectors (
+            model TEXT, sha256 TEXT, dim INTEGER, vector BLOB, PRIMARY KEY (model, sha256))''')
+        self.db.commit()
+
+    def get_many(self, model, digests):
+        """Return {digest: vector} for the digests already cached"""
+        found = {}
+        digests = list(digests)
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                rows = self.db.execute(f"SELECT sha256, vector FROM vectors WHERE model = ? AND sha256 IN "
+                                       f"({', '.join('?' * len(chunk))})", [model, *chunk]).fetchall()
+                found.update((digest, np.frombuffer(blob, dtype=np.float32)) for digest, blob in rows)
+        return found
+
+    def put_many(self, model, vectors):
+        """Save an iterable of (digest, vector)"""
+        rows = [(model, digest, len(vector), np.asarray(vector, dtype=np.float32).tobytes())
+                for digest, vector in vectors]
+        with self.lock:
+            self.db.executemany('INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)', rows)
+            self.db.commit()
+
+    def vectors(self, model, limit=None):
+        """Cached vectors for model as one float32 array (n, dim)"""
+        with self.lock:
+            rows = self.db.execute('SELECT vector FROM vectors WHERE model = ? LIMIT ?',
+                                   (model, -1 if limit is None else limit)).fetchall()
+        return np.array([np.frombuffer(blob, dtype=np.float32) for blob, in rows], dtype=np.float32)
+
+class Embedder:
+    """Embeds texts locally in large batches, reusing cached vectors.
+
+    Identical texts (duplicate pages, re-ingests, migrations to a new layout)
+    are embedded once per model. embed() returns a float32 array with one row
+    per input text, ready for Chroma's embeddings= argument. Vectors are cached
+    under model, which defaults to model_key(embedding_function).
+    """
+
+    def __init__(self, embedding_function=None, model=None, cache=None, batch_size=EMBED_BATCH):
+        if embedding_function is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            embedding_function = DefaultEmbeddingFunction()
+            model = model or DEFAULT_MODEL
+        self.embedding_function = embedding_function
+        self.model = model or model_key(embedding_function)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.stats = {'texts': 0, 'cached': 0, 'embedded': 0}
+
+    def embed(self, texts):
+        texts = [text or '' for text in texts]
+        digests = [text_sha256(text) for text in texts]
+        vectors = self.cache.get_many(self.model, set(digests)) if self.cache is not None else {}
+        self.stats['texts'] += len(texts)
+        self.stats['cached'] += sum(1 for digest in digests if digest in vectors)
+
+        # Embed each missing text once, however often it repeats
+        missing = list({digest: text for digest, text in zip(digests, texts) if digest not in vectors}.items())
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            embedded = np.asarray(self.embedding_function([text for _, text in batch]), dtype=np.float32)
+            new = list(zip((digest for digest, _ in batch), embedded))
+            vectors.update(new)
+            if self.cache is not None:
+                self.cache.put_many(self.model, new)
+            self.stats['embedded'] += len(batch)
+
+        return np.stack([vectors[digest] for digest in digests]) if texts else np.empty((0, 0), dtype=np.float32)
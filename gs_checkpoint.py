@@ -0,0 +1,50 @@
+import os
+import json
+import hashlib
+
+CHECKPOINT_DIR = 'checkpoints'
+
+class Checkpoint:
+    """Completed result pages of one query, kept in an append-only JSON-lines file.
+
+    Each line records one finished start offset and the rows parsed from it, so
+    a killed crawl loses at most the page that was in flight.
+    """
+
+    def __init__(self, query, directory=CHECKPOINT_DIR):
+        self.query = query
+        key = hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(directory, f"{key}.jsonl")
+        self.pages = {}
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A half-written last line from a killed run; that page is simply redone
+                        continue
+                    if record.get('query') == self.query:
+                        self.pages[record['start']] = record['rows']
+
+    def done(self, start):
+        return start in self.pages
+
+    def rows(self, start):
+        return self.pages[start]
+
+    def record(self, start, rows):
+        """Mark start as finished and persist its rows before returning"""
+        self.pages[start] = rows
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'query': self.query, 'start': start, 'rows': rows}, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def clear(self):
+        """Forget every finished page of this query"""
+        self.pages = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,46 +1,6 @@
 #!/bin/bash
 
-# Create the pdf directory if it doesn't exist
-mkdir -p pdf
-
-# Remove all existing files in the pdf directory
-# rm -f pdf/*
-
-# Read each URL from src.txt and download it if it ends with .pdf
-total_urls=$(wc -l < url.txt)
-count=0
-success=0
-failed=0
-
-echo "Starting PDF download process..."
-
-while IFS= read -r url; do
-    # Check if the URL ends with .pdf
-    if [[ "$url" == *.pdf ]]; then
-        count=$((count + 1))
-        echo -e "\nProcessing URL $count of $total_urls: $url"
-        
-        # Extract the filename from the URL
-        filename=$(basename "$url")
-        
-        # If filename is empty (e.g., URL ends with a slash), use a default name
-        if [[ -z "$filename" ]]; then
-            filename="index.html"
-        fi
-
-        # Download the URL and save it to the pdf directory
-        echo "Downloading..."
-        if curl -s -o "pdf/$filename" "$url"; then
-            echo "Saved: pdf/$filename"
-            success=$((success + 1))
-        else
-            echo "Failed to download: $url"
-            failed=$((failed + 1))
-        fi
-    fi
-done < url.txt
-
-echo -e "\nDownload complete!"
-echo "Total URLs processed: $count"
-echo "Successfully downloaded: $success"
-echo "Failed to download: $failed"
+# Download every .pdf URL in url.txt into the pdf directory.
+# Downloads run concurrently and stream to disk; a summary is written to download_report.json.
+# Extra arguments are passed through (e.g. -w 16 --per-host 4).
+python "$(dirname "$0")/pdf_download.py" url.txt --pdf-only "$@"
@@ -0,0 +1,178 @@
+import time
+import random
+import asyncio
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from http_cache import cached_get
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Connection': 'keep-alive'
+}
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Allow rate requests per second on average, with bursts of up to capacity"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        # Take a token now and sleep off any debt; callers queue up in arrival order
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+class Fetcher:
+    """Fetch pages concurrently over one pooled keep-alive session.
+
+    Each host gets its own token bucket (rate requests/sec, bursts of burst) and
+    at most per_host requests in flight; concurrency caps the total across hosts.
+    429 and 5xx responses are retried with exponential backoff plus jitter,
+    honouring Retry-After when the server sends it. With a ResponseCache, fresh
+    hits skip the network (and the rate limit) and stale ones are revalidated;
+    cacheable(response) decides which 200s are worth keeping (see cached_get).
+    close() (or leaving a with block) shuts down the worker threads and session.
+    """
+
+    def __init__(self, rate=0.2, burst=1, concurrency=4, per_host=1, retries=4,
+                 backoff=2.0, timeout=(10, 30), headers=None, cache=None, cacheable=None):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.cacheable = cacheable
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+
+        # requests is blocking, so each in-flight request runs on its own pool thread
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        self.buckets = {}
+        self._loop = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the request threads and close pooled connections"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def _bind(self):
+        """(Re)create the asyncio primitives for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self.limit = asyncio.Semaphore(self.concurrency)
+            self.host_limits = {}
+
+    def retry_delay(self, attempt, response):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+
+    async def fetch(self, url, params=None):
+        """Return the response for url, raising the last error if every attempt failed"""
+        self._bind()
+        if self.cache:
+            entry = self.cache.lookup(url, params)
+            if entry and self.cache.is_fresh(entry):
+                response = self.cache.to_response(entry)
+                if self.cacheable is None or self.cacheable(response):
+                    return response
+
+        host = urlsplit(url).netloc
+        host_limit = self.host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+        bucket = self.buckets.setdefault(host, TokenBucket(self.rate, self.burst)) if self.rate else None
+
+        # Wait for the host first so a busy host doesn't hold slots other hosts could use
+        async with host_limit, self.limit:
+            for attempt in range(self.retries + 1):
+                if bucket:
+                    await bucket.acquire()
+
+                response = None
+                try:
+                    if self.cache:
+                        get = partial(cached_get, self.session, url, self.cache, params=params,
+                                      cacheable=self.cacheable, timeout=self.timeout)
+                    else:
+                        get = partial(self.session.get, url, params=params, timeout=self.timeout)
+                    response = await self._loop.run_in_executor(self.executor, get)
+                    if response.status_code not in RETRY_STATUS:
+                        return response
+                    error = requests.exceptions.HTTPError(f"{response.status_code} for {response.url}", response=response)
+                except requests.exceptions.RequestException as e:
+                    error = e
+
+                if attempt == self.retries:
+                    if response is not None:
+                        return response
+                    raise error
+
+                delay = self.retry_delay(attempt, response)
+                print(f"{error}. Retrying in {delay:.1f} seconds...")
+                await asyncio.sleep(delay)
+
+    async def fetch_all(self, jobs):
+        """Fetch (url, params) jobs concurrently and return their responses in job order"""
+        return await asyncio.gather(*(self.fetch(url, params) for url, params in jobs))
+
+    def fetch_iter(self, jobs):
+        """Yield a response (or None on failure) for each (url, params) job, in job order.
+
+        The jobs run on an event loop in a background thread, so later pages keep
+        downloading while the caller works on earlier ones. Jobs not yet consumed
+        are cancelled when the generator is closed.
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        futures = [asyncio.run_coroutine_threadsafe(self.fetch(url, params), loop) for url, params in jobs]
+        try:
+            for (url, params), future in zip(jobs, futures):
+                try:
+                    yield future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Failed to fetch {url}: {e}")
+                    yield None
+        finally:
+            for future in futures:
+                future.cancel()
+
+            async def settle():
+                # Let the cancelled fetches unwind before the loop goes away
+                tasks = asyncio.all_tasks() - {asyncio.current_task()}
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            asyncio.run_coroutine_threadsafe(settle(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
@@ -1,9 +1,12 @@
-import os
-from chromadb import CloudClient
+import asyncio
+from chroma_backend import get_client, add_backend_arguments
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage
-import json
+from llm_metadata import MetadataExtractor, parse_metadata, empty_metadata, LLM_BATCH
+from llm_cache import LLMCache, LLM_CACHE
+from metadata_rules import CONFIDENCE
+from chroma_ingest import first_pages
 
 def init_chat_model(model_name, model_provider):
     """Initialize chat model based on provider"""
@@ -11,14 +14,17 @@ def init_chat_model(model_name, model_provider):
         return ChatGroq(
             model_name=model_name,
             temperature=0,
-            max_tokens=1000
+            # Room for the replies to a whole batch of papers
+            max_tokens=2000
         )
     else:
         raise ValueError(f"Unsupported model provider: {model_provider}")
 
-def extract_metadata_with_llm(text, llm):
-    """Extract metadata using LLM with improved JSON handling"""
-    prompt = """Extract the title, author(s), publication, year of publication and the publisher from the text. 
+# The LLM is only asked about papers whose first page the rules can't read these from with confidence;
+# journal and publisher are often missing from a first page, so they don't force a call
+RULE_FIELDS = ["Title", "Author", "Year"]
+
+METADATA_PROMPT = """Extract the title, author(s), publication, year of publication and the publisher from the text. 
 Return the result in valid JSON format with the following keys: Title, Author, Publication, Year, Publisher.
 If a field is not found, leave it as an empty string.
     
@@ -31,120 +37,151 @@ Example format:
   "Publisher": "Sample Publisher"
 }"""
 
+def extract_metadata_with_llm(text, llm, cache=None):
+    """Extract metadata using LLM with improved JSON handling"""
     # Create message
-    message = HumanMessage(content=prompt + "\n\n" + text)
+    message = HumanMessage(content=METADATA_PROMPT + "\n\n" + text)
     
     try:
-        # Get response from LLM
-        response = llm.invoke([message])
-        response_text = response.content
-        
-        # Try to parse JSON response
-        try:
-            metadata = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Fallback to basic parsing if JSON parsing fails
-            metadata = {
-                "Title": "",
-                "Author": "",
-                "Publication": "",
-                "Year": "",
-                "Publisher": ""
-            }
-            
-            for line in response_text.split('\n'):
-                for key in metadata.keys():
-                    if key in line:
-                        parts = line.split(":")
-                        if len(parts) > 1:
-                            metadata[key] = parts[1].strip().strip('"')
-                            break
-            
-            # Ensure all required keys are present
-            for key in ["Title", "Author", "Publication", "Year", "Publisher"]:
-                if key not in metadata:
-                    metadata[key] = ""
-        
-        return metadata
+        # Reuse the reply from an earlier run for the same model, prompt and text
+        response_text = cache.get(llm, METADATA_PROMPT, text) if cache is not None else None
+        if response_text is None:
+            # Get response from LLM
+            response_text = llm.invoke([message]).content
+            if cache is not None:
+                cache.put(llm, METADATA_PROMPT, text, response_text)
+        return parse_metadata(response_text)
     
     except Exception as e:
         print(f"Error extracting metadata with LLM: {str(e)}")
-        return {
-            "Title": "",
-            "Author": "",
-            "Publication": "",
-            "Year": "",
-            "Publisher": ""
-        }
+        return empty_metadata()
+
+async def update_paper(col, source, text, ids, metadatas, extractor):
+    """Add LLM metadata from one paper's first page to that page's documents; return how many were updated"""
+    # Extract metadata from the text of the first page (all of its chunks, in order) using LLM.
+    # Fields nobody found are dropped so they don't blank values stored earlier
+    metadata = {key: value for key, value in (await extractor.aextract(text)).items() if value}
+    
+    # Check if all metadata fields are empty
+    if not metadata:
+        print(f"No metadata found in first page of '{source or col.name}'")
+        return 0
+        
+    # Update the paper's first page documents with both existing and new metadata in one call.
+    # Only ids and metadata are sent, so the page text isn't uploaded or embedded again
+    await asyncio.to_thread(
+        col.update,
+        metadatas=[{**existing, **metadata} for existing in metadatas],
+        ids=ids
+    )
+    return len(ids)
+
+async def update_collection(client, name, extractor, sources=None):
+    """Add LLM metadata from each paper's first page to that paper's first-page documents.
+
+    A corpus collection holds many papers, so each one is extracted and
+    updated on its own, and a paper that fails doesn't stop the others.
+    sources limits the run to those papers (source_file values). Returns the
+    sources that failed. Chroma calls run on worker threads so they overlap
+    other collections' LLM calls.
+    """
+    # Get the first page (page_number = 1) documents, grouped by paper
+    col = await asyncio.to_thread(client.get_collection, name=name)
+    papers = await asyncio.to_thread(first_pages, col)
+    if sources is not None:
+        papers = {source: paper for source, paper in papers.items() if source in sources}
+    
+    if not papers:
+        print(f"No documents found in collection '{name}'")
+        return []
+        
+    results = await asyncio.gather(*(update_paper(col, source, text, ids, metadatas, extractor)
+                                     for source, (text, ids, metadatas) in papers.items()),
+                                   return_exceptions=True)
+    
+    failed = []
+    for source, result in zip(papers, results):
+        if isinstance(result, Exception):
+            print(f"❌ Error processing '{source or name}' in collection '{name}': {str(result)}")
+            failed.append(source)
+    updated = sum(result for result in results if not isinstance(result, Exception))
+    
+    if len(failed) < len(papers):
+        print(f"✅ Successfully updated metadata for {updated} documents of {len(papers) - len(failed)} papers "
+              f"in collection '{name}'" + (f", {len(failed)} failed" if failed else ""))
+    return failed
+
+async def update_collections(client, names, extractor, retries=1):
+    """Run update_collection for every name, a failure in one never stopping the others.
+
+    A collection is retried up to retries times, for the papers that failed only.
+    """
+    # Keep a few collections read ahead of the LLM calls, not all of them at once
+    slots = asyncio.Semaphore(extractor.concurrency * extractor.batch_size * 2)
+    
+    async def run(idx, name):
+        async with slots:
+            print(f"\nProcessing collection '{name}' ({idx}/{len(names)})")
+            failed = None
+            for attempt in range(retries + 1):
+                try:
+                    failed = await update_collection(client, name, extractor, failed)
+                    if not failed:
+                        return True
+                    error = f"{len(failed)} papers failed"
+                except Exception as e:
+                    error = str(e)
+                if attempt == retries:
+                    print(f"❌ Error processing collection '{name}': {error}")
+                    return False
+                await asyncio.sleep(extractor.retry_delay(attempt))
+    
+    results = await asyncio.gather(*(run(idx, name) for idx, name in enumerate(names, 1)))
+    print(f"\nUpdated {sum(results)} of {len(names)} collections ({extractor.stats['calls']} LLM calls, "
+          f"{extractor.stats['rules']} read by rules alone, {extractor.stats['cached']} from the LLM cache, "
+          f"{extractor.stats['retries']} retried)")
+    return results
 
-def main():
+def main(backend=None, chroma_path=None, concurrency=8, llm_cache=LLM_CACHE, llm_batch=LLM_BATCH,
+         rules=True, threshold=CONFIDENCE):
     # Load environment variables
     load_dotenv()
     
     # Initialize LLM
     llm = init_chat_model("llama-3.1-8b-instant", model_provider="groq")
     
-    # Get Chroma Cloud credentials
-    ch_api_key = os.getenv('CHROMA_API_KEY')
-    ch_tenant = os.getenv('CHROMA_TENANT')
-    ch_database = os.getenv('CHROMA_DATABASE')
-    
-    if not all([ch_api_key, ch_tenant, ch_database]):
-        raise ValueError("Missing Chroma Cloud credentials in environment variables")
-    
-    # Initialize Chroma Cloud client
-    client = CloudClient(
-        tenant=ch_tenant,
-        database=ch_database,
-        api_key=ch_api_key
-    )
+    # Chroma Cloud, a local embedded store or an in-memory one
+    client = get_client(backend, chroma_path)
     
     # Get all collections
-    collections = client.list_collections()
+    names = [collection.name for collection in client.list_collections()]
     
-    print(f"Found {len(collections)} collections to process")
+    print(f"Found {len(names)} collections to process")
     
-    for idx, collection in enumerate(collections, 1):
-        print(f"\nProcessing collection '{collection.name}' ({idx}/{len(collections)})")
-        
-        try:
-            # Get the first page (page_number = 1) document
-            col = client.get_collection(name=collection.name)
-            results = col.get(where={"page_number": 1})
-            
-            if not results['documents']:
-                print(f"No documents found in collection '{collection.name}'")
-                continue
-                
-            # Extract metadata from the text of the first page using LLM
-            first_page_text = results['documents'][0]
-            metadata = extract_metadata_with_llm(first_page_text, llm)
-            
-            # Check if all metadata fields are empty
-            if all(value == "" for value in metadata.values()):
-                print(f"No metadata found in first page of collection '{collection.name}'")
-                continue
-                
-            # Update only the first page document with the new metadata
-            for i in range(len(results['documents'])):
-                # Create a new metadata dictionary with both existing and new metadata
-                new_metadata = {
-                    **results['metadatas'][i],
-                    **metadata
-                }
-                
-                # Update the document with the new metadata
-                col.update(
-                    documents=results['documents'][i],
-                    metadatas=[new_metadata],
-                    ids=results['ids'][i]
-                )
-            
-            print(f"✅ Successfully updated metadata for {len(results['documents'])} documents in collection '{collection.name}'")
-            
-        except Exception as e:
-            print(f"❌ Error processing collection '{collection.name}': {str(e)}")
-            continue
+    # Up to concurrency LLM calls in flight, each retried on failure and carrying up to llm_batch first pages
+    # First pages already sent on an earlier run are answered from the LLM cache
+    cache = LLMCache(llm_cache) if llm_cache else None
+    # Papers the rule-based extractor reads with confidence skip the LLM entirely
+    extractor = MetadataExtractor(llm, METADATA_PROMPT, concurrency=concurrency, cache=cache, batch_size=llm_batch,
+                                  required=RULE_FIELDS if rules else None, threshold=threshold)
+    asyncio.run(update_collections(client, names, extractor))
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Add LLM-extracted metadata to every collection')
+    add_backend_arguments(parser)
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='LLM calls in flight at once (default: 8)')
+    parser.add_argument('--llm-cache', type=str, default=LLM_CACHE,
+                        help=f'SQLite file of LLM replies (default: {LLM_CACHE})')
+    parser.add_argument('--no-llm-cache', action='store_true', help='Send every prompt to the LLM again')
+    parser.add_argument('--llm-batch', type=int, default=LLM_BATCH,
+                        help=f'First pages per LLM request, 1 to send each on its own (default: {LLM_BATCH})')
+    parser.add_argument('--no-rules', action='store_true',
+                        help='Send every first page to the LLM instead of reading what it can with rules first')
+    parser.add_argument('--rule-confidence', type=float, default=CONFIDENCE,
+                        help=f'Trust rule-extracted fields scored at least this, 0-1 (default: {CONFIDENCE})')
+    args = parser.parse_args()
+
+    main(args.backend, args.chroma_path, args.concurrency, None if args.no_llm_cache else args.llm_cache,
+         args.llm_batch, not args.no_rules, args.rule_confidence)
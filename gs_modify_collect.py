@@ -1,10 +1,13 @@
-import os
-from chromadb import CloudClient
+from chroma_backend import get_client, add_backend_arguments
 from dotenv import load_dotenv
+from metadata_rules import rule_metadata, CONFIDENCE
+from chroma_ingest import update_metadata, first_pages, UPDATE_BATCH
 
-def extract_metadata_from_text(text):
-    """Extract metadata from text content"""
-    # Simple text parsing for metadata (this would need to be customized based on actual content)
+def extract_metadata_from_text(text, threshold=CONFIDENCE):
+    """Extract metadata from text content.
+
+    Fields the rule-based extractor scores below threshold are left empty.
+    """
     metadata = {
         "Publication": "",
         "Year": "",
@@ -13,42 +16,18 @@ def extract_metadata_from_text(text):
         "Author": ""
     }
     
-    # This is a basic example - you would need to implement actual parsing logic
-    # based on how the metadata appears in your text
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    
-    for line in lines:
-        if line.lower().startswith("publication:"):
-            metadata["Publication"] = line.split(":", 1)[1].strip()
-        elif line.lower().startswith("year:"):
-            metadata["Year"] = line.split(":", 1)[1].strip()
-        elif line.lower().startswith("publisher:"):
-            metadata["Publisher"] = line.split(":", 1)[1].strip()
-        elif line.lower().startswith("title:"):
-            metadata["Title"] = line.split(":", 1)[1].strip()
-        elif line.lower().startswith("author:"):
-            metadata["Author"] = line.split(":", 1)[1].strip()
+    # DOI, year, journal, publisher, title and author lines; "Title:"-style labels still win
+    found = rule_metadata(text, threshold)
+    metadata.update((key, value) for key, value in found.items() if key in metadata or key == "DOI")
     
     return metadata
 
-def main():
+def main(backend=None, chroma_path=None, batch_size=UPDATE_BATCH):
     # Load environment variables
     load_dotenv()
     
-    # Get Chroma Cloud credentials
-    ch_api_key = os.getenv('CHROMA_API_KEY')
-    ch_tenant = os.getenv('CHROMA_TENANT')
-    ch_database = os.getenv('CHROMA_DATABASE')
-    
-    if not all([ch_api_key, ch_tenant, ch_database]):
-        raise ValueError("Missing Chroma Cloud credentials in environment variables")
-    
-    # Initialize Chroma Cloud client
-    client = CloudClient(
-        tenant=ch_tenant,
-        database=ch_database,
-        api_key=ch_api_key
-    )
+    # Chroma Cloud, a local embedded store or an in-memory one
+    client = get_client(backend, chroma_path)
     
     # Get all collections
     collections = client.list_collections()
@@ -59,44 +38,42 @@ def main():
         print(f"\nProcessing collection '{collection.name}' ({idx}/{len(collections)})")
         
         try:
-            # Get the first page (page_number = 1) document
+            # Get the first page (page_number = 1) text of every paper; a corpus collection holds many
             col = client.get_collection(name=collection.name)
-            results = col.get(where={"page_number": 1})
+            papers = first_pages(col, batch_size)
             
-            if not results['documents']:
+            if not papers:
                 print(f"No documents found in collection '{collection.name}'")
                 continue
-                
-            # Extract metadata from the text of the first page
-            first_page_text = results['documents'][0]
-            metadata = extract_metadata_from_text(first_page_text)
             
-            if not any(metadata.values()):
-                print(f"No metadata found in first page of collection '{collection.name}'")
-                continue
+            updated = 0
+            for source, (first_page_text, _, _) in papers.items():
+                # Extract metadata from the text of the paper's first page
+                metadata = extract_metadata_from_text(first_page_text)
                 
-            # Update all documents with the new metadata
-            all_results = col.get()
-            
-            for i in range(len(all_results['documents'])):
-                # Create a new metadata dictionary with both existing and new metadata
-                new_metadata = {
-                    **all_results['metadatas'][i],
-                    **metadata
-                }
+                if not any(metadata.values()):
+                    print(f"No metadata found in first page of '{source or collection.name}'")
+                    continue
                 
-                # Update the document with the new metadata
-                col.update(
-                    documents=all_results['documents'][i],
-                    metadatas=[new_metadata],
-                    ids=all_results['ids'][i]
-                )
+                # Update the paper's documents with the fields found, leaving values set earlier (e.g. by the LLM)
+                # for the rest. Only ids and metadata are sent, so no page is re-embedded
+                where = {"source_file": source} if source else None
+                updated += update_metadata(col, {key: value for key, value in metadata.items() if value}, where,
+                                           batch_size)
             
-            print(f"✅ Successfully updated metadata for {len(all_results['documents'])} documents in collection '{collection.name}'")
+            print(f"✅ Successfully updated metadata for {updated} documents of {len(papers)} papers "
+                  f"in collection '{collection.name}'")
             
         except Exception as e:
             print(f"❌ Error processing collection '{collection.name}': {str(e)}")
             continue
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Add metadata parsed from the first page to every collection')
+    add_backend_arguments(parser)
+    parser.add_argument('-b', '--batch-size', type=int, default=UPDATE_BATCH,
+                        help=f'Records per metadata update round trip (default: {UPDATE_BATCH})')
+    args = parser.parse_args()
+
+    main(args.backend, args.chroma_path, args.batch_size)
@@ -1,7 +1,7 @@
-import requests
 import os
-import time
-from random import uniform
+from gs_fetch import Fetcher
+from http_cache import ResponseCache
+from gs_parse import has_results
 
 # Create pages directory if it doesn't exist
 if not os.path.exists('pages'):
@@ -19,37 +19,23 @@ headers = {
 url_base = "https://scholar.google.com.my/scholar?start="
 url_tail = "&q=ChatGPT+Educational+Impact+and+Psychological+Implications&hl=enen&as_sdt=0,5&as_vis=1"
 
-for i in range(1, 11):
-    url = f"{url_base}{i}{url_tail}"
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
+# Pace requests at one every 3.5 seconds on average; 429/5xx responses back off from 30 seconds
+# Pages fetched within the last day are served from the local cache; CAPTCHA pages are never cached
+fetcher = Fetcher(rate=1 / 3.5, headers=headers, retries=2, backoff=30, cache=ResponseCache(),
+                  cacheable=has_results)
+jobs = [(f"{url_base}{i}{url_tail}", None) for i in range(1, 11)]
+
+with fetcher:
+    for i, ((url, _), response) in enumerate(zip(jobs, fetcher.fetch_iter(jobs)), 1):
+        if response is None:
+            continue
+        if response.status_code != 200:
+            print(f"Error fetching {url}: status {response.status_code}")
+            continue
+
         # Save the HTML content to a file
         filename = f"pages/{i}.html"
         with open(filename, 'w', encoding='utf-8') as file:
             file.write(response.text)
-        
+
         print(f"Saved {filename}")
-        
-        # Add random delay between 2-5 seconds to avoid triggering rate limits
-        delay = uniform(2, 5)
-        print(f"Waiting for {delay:.2f} seconds...")
-        time.sleep(delay)
-    
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching {url}: {e}")
-        print("Retrying in 60 seconds...")
-        time.sleep(60)  # Wait longer before retrying
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # Save the HTML content to a file
-            filename = f"pages/{i}.html"
-            with open(filename, 'w', encoding='utf-8') as file:
-                file.write(response.text)
-            
-            print(f"Successfully saved {filename} after retry")
-        except requests.exceptions.RequestException as e:
-            print(f"Failed to fetch {url} even after retry: {e}")
@@ -0,0 +1,192 @@
+import os
+import json
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Prefer lxml when it is installed; it is several times faster than html.parser
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+# Bump when extraction changes so cached rows in existing manifests are rebuilt
+MANIFEST_VERSION = 1
+
+# Result containers on a Scholar page: the text block only, or the whole record incl. the PDF side link
+RESULT_CLASS = 'gs_ri'
+RECORD_CLASS = 'gs_r gs_or gs_scl'
+
+# Found in the CAPTCHA and "unusual traffic" pages Scholar serves, with a 200, instead of results
+BLOCK_MARKERS = ('gs_captcha', 'recaptcha', 'unusual traffic', '/sorry/')
+
+# (tag, class) -> field; the only place that knows Scholar's per-item markup
+SELECTORS = {
+    ('h3', 'gs_rt'): 'title',
+    ('div', 'gs_a'): 'authors',
+    ('span', 'gs_fl'): 'year',
+    ('div', 'gs_or_ggsm'): 'pdf',
+}
+
+class Article(namedtuple('Article', ['title', 'authors', 'year', 'url', 'pdf_url'])):
+    """One search result; missing fields are "N/A" (pdf_url is None when there is no side link)"""
+    __slots__ = ()
+
+    def to_row(self, prefer_pdf=False):
+        url = self.pdf_url if prefer_pdf and self.pdf_url else self.url
+        return {
+            'Title': self.title,
+            'Author': self.authors,
+            'Year': self.year,
+            'URL': url
+        }
+
+def extract_item(item):
+    """Build an Article from one result container in a single walk over its nodes"""
+    found = {}
+    first_link = None
+    for tag in item.descendants:
+        if tag.name is None:
+            continue
+        if first_link is None and tag.name == 'a' and tag.get('href'):
+            first_link = tag['href']
+        for cls in tag.get('class', ()):
+            field = SELECTORS.get((tag.name, cls))
+            if field and field not in found:
+                found[field] = tag
+                break
+
+    title_tag = found.get('title')
+    title = title_tag.get_text(strip=True) if title_tag else "N/A"
+
+    # Prefer the title link; fall back to the first link anywhere in the item
+    title_link = title_tag.find('a', href=True) if title_tag else None
+    url = title_link['href'] if title_link else first_link or "N/A"
+
+    author_tag = found.get('authors')
+    author_text = author_tag.get_text(strip=True) if author_tag else "N/A"
+    authors = author_text.split(' - ')[0].strip() if ' - ' in author_text else author_text
+
+    year_tag = found.get('year')
+    year = year_tag.get_text(strip=True).split(' ')[-1].strip() if year_tag else "N/A"
+
+    # The side link is usually labelled [PDF]; otherwise take whatever it points to
+    pdf_url = None
+    pdf_div = found.get('pdf')
+    if pdf_div:
+        links = pdf_div.find_all('a', href=True)
+        pdf_links = [a for a in links if '[PDF]' in a.get_text()]
+        if pdf_links or links:
+            pdf_url = (pdf_links or links)[0]['href']
+
+    return Article(title, authors, year, url, pdf_url)
+
+def list_html_files(directory):
+    """Return the HTML files in a directory in a stable order"""
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.html'))
+
+def parse_html(html, container_class=RESULT_CLASS):
+    """Parse only the result containers of a Google Scholar page and return their Articles"""
+    # Everything outside the result containers (scripts, sidebars, footer) is skipped by the parser
+    strainer = SoupStrainer('div', class_=container_class)
+    soup = BeautifulSoup(html, PARSER, parse_only=strainer)
+    return [extract_item(item) for item in soup.find_all('div', class_=container_class)]
+
+def is_block_page(html):
+    """Whether a page with no results is Scholar refusing the request rather than an empty result list"""
+    html = html.lower()
+    return any(marker in html for marker in BLOCK_MARKERS)
+
+def has_results(response, container_class=RESULT_CLASS):
+    """Whether a fetched Scholar page holds at least one result; the cacheable check for Fetcher"""
+    return bool(parse_html(response.text, container_class))
+
+def parse_results(file_path, container_class=RESULT_CLASS):
+    """Parse a saved Google Scholar page and return its Articles"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return parse_html(file, container_class)
+
+def map_files(parse_file, files, workers=1):
+    """Yield parse_file(file) for each file, using a process pool when workers > 1.
+
+    parse_file must be a module-level function so it can be sent to the workers.
+    Results are yielded lazily and in the same order as files.
+    """
+    if workers <= 1:
+        for file_path in files:
+            yield parse_file(file_path)
+        return
+
+    # Hand out several files per task so small pages don't drown in IPC overhead
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(parse_file, files, chunksize=chunksize)
+
+def file_sha256(file_path):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    """Load a page manifest, or return an empty one if missing or from another version"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+def save_manifest(manifest_path, files):
+    """Write the manifest atomically so an interrupted run never leaves it half-written"""
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'version': MANIFEST_VERSION, 'files': files}, file, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+def map_files_cached(parse_file, files, manifest_path, workers=1, full=False):
+    """Like map_files, but reuse the rows recorded in manifest_path for unchanged files.
+
+    A file is unchanged when its size and mtime match the manifest, or failing
+    that, when its SHA-256 does. Only new or changed files are parsed; full=True
+    ignores the manifest and parses everything. The manifest is rewritten once
+    all files have been yielded.
+    """
+    cached = {} if full else load_manifest(manifest_path)
+    entries = {}
+    stale = []
+
+    for file_path in files:
+        name = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        entry = cached.get(name)
+
+        # Cheap check first; only hash files whose size or mtime moved
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            entries[name] = entry
+            continue
+
+        sha256 = file_sha256(file_path)
+        if entry and entry['sha256'] == sha256:
+            entries[name] = {**entry, 'size': stat.st_size, 'mtime': stat.st_mtime}
+        else:
+            entries[name] = {'sha256': sha256, 'size': stat.st_size, 'mtime': stat.st_mtime, 'rows': None}
+            stale.append(file_path)
+
+    print(f"{len(files) - len(stale)} pages unchanged, {len(stale)} to parse")
+
+    # Stale files are a subsequence of files, so their results can be merged back in order
+    parsed = map_files(parse_file, stale, workers)
+    for file_path in files:
+        entry = entries[os.path.basename(file_path)]
+        if entry['rows'] is None:
+            entry['rows'] = next(parsed)
+        yield entry['rows']
+
+    save_manifest(manifest_path, entries)
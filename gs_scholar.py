@@ -1,49 +1,26 @@
 import os
-import pandas as pd
-from bs4 import BeautifulSoup
+from article_writer import save_articles
+from gs_parse import RESULT_CLASS, list_html_files, parse_results, map_files_cached
 
-def process_html_files(directory):
-    results = []
-    
-    # Get all HTML files in the directory
-    html_files = [f for f in os.listdir(directory) if f.endswith('.html')]
-    
-    for filename in html_files:
-        file_path = os.path.join(directory, filename)
-        
-        with open(file_path, 'r', encoding='utf-8') as file:
-            soup = BeautifulSoup(file, 'html.parser')
-            items = soup.find_all('div', class_='gs_ri')
-            
-            print(f"Processing {filename}: Found {len(items)} articles")
-            
-            for item in items:
-                title_tag = item.find('h3', class_='gs_rt')
-                title = title_tag.get_text(strip=True) if title_tag else "N/A"
-
-                url_tag = item.find('a', href=True) if item.find('a', href=True) else None
-                url = url_tag['href'] if url_tag else "N/A"
+def parse_file(file_path):
+    """Extract the articles from one saved Google Scholar page"""
+    articles = parse_results(file_path, RESULT_CLASS)
 
-                author_tag = item.find('div', class_='gs_a')
-                author_text = author_tag.get_text(strip=True) if author_tag else "N/A"
-                authors = author_text.split(' - ')[0].strip() if ' - ' in author_text else author_text
+    print(f"Processing {os.path.basename(file_path)}: Found {len(articles)} articles")
 
-                year_tag = item.find('span', class_='gs_fl')
-                year = year_tag.get_text(strip=True).split(' ')[-1].strip() if year_tag else "N/A"
+    return [article.to_row() for article in articles]
 
-                results.append({
-                    'Title': title,
-                    'Author': authors,
-                    'Year': year,
-                    'URL': url
-                })
+def process_html_files(directory, workers=1, full=False):
+    """Yield article rows from every saved page in directory, in file order"""
+    # Get all HTML files in the directory
+    html_files = list_html_files(directory)
     
-    return results
-
-def save_to_csv(results, filename='articles.csv'):
-    df = pd.DataFrame(results)
-    df.to_csv(filename, index=False)
-    print(f"Results saved to {filename}")
+    # Only new or changed pages are parsed; the rest come from the manifest unless full=True
+    manifest_path = os.path.join(directory, '.gs_scholar.manifest.json')
+    
+    # Parse the files (in parallel when workers > 1) and stream rows in file order
+    for rows in map_files_cached(parse_file, html_files, manifest_path, workers, full):
+        yield from rows
 
 if __name__ == '__main__':
     import argparse
@@ -51,9 +28,13 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Process Google Scholar HTML files')
     parser.add_argument('directory', type=str, help='Directory containing Google Scholar HTML pages')
     parser.add_argument('-o', '--output', type=str, default='articles.csv', 
-                        help='Output CSV filename (default: articles.csv)')
+                        help='Output file, .csv or .jsonl (default: articles.csv)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of parser processes (default: 1)')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the page manifest and reparse every file')
     args = parser.parse_args()
 
     print(f"Reading HTML files from {args.directory}...")
-    results = process_html_files(args.directory)
-    save_to_csv(results, args.output)
+    results = process_html_files(args.directory, args.workers, args.full)
+    save_articles(results, args.output)
@@ -1,10 +1,20 @@
 import os
-from PyPDF2 import PdfReader
-from chromadb import CloudClient
+from chroma_backend import get_client, add_backend_arguments, add_index_arguments, index_from_args
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage
-import json
+import asyncio
+import itertools
+from llm_metadata import MetadataExtractor, parse_metadata, empty_metadata
+from llm_cache import LLMCache, LLM_CACHE
+from metadata_rules import CONFIDENCE
+from pdf_text import extract_files, extract_range
+from text_cache import TextCache, TEXT_CACHE
+from chunker import CHUNK_TOKENS, OVERLAP_TOKENS
+from embed_cache import Embedder, EmbeddingCache, EMBED_CACHE
+from corpus import corpus_settings, shard_for
+from chroma_ingest import Uploader, plan_ingest, BATCH_SIZE, MAX_BATCH_BYTES
+from upload_pdf import collection_documents
 
 def init_chat_model(model_name, model_provider):
     """Initialize chat model based on provider"""
@@ -12,14 +22,22 @@ def init_chat_model(model_name, model_provider):
         return ChatGroq(
             model_name=model_name,
             temperature=0,
-            max_tokens=1000
+            # Room for the replies to a whole batch of papers, abstracts included
+            max_tokens=4000
         )
     else:
         raise ValueError(f"Unsupported model provider: {model_provider}")
 
-def extract_metadata_with_llm(text, llm):
-    """Extract metadata using LLM with improved JSON handling"""
-    prompt = """Extract the title, author(s), publication, year of publication, abstract and the publisher from the text. 
+# Page 1 metadata fields; the abstract stays on page 1, the rest is copied to every page
+METADATA_KEYS = ["Title", "Author", "Publication", "Year", "Publisher", "Abstract"]
+
+# The LLM is only asked about papers whose first page the rules can't read these from with confidence
+RULE_FIELDS = ["Title", "Author", "Year", "Abstract"]
+
+# First pages per LLM request; abstracts make long replies, so fewer than llm_metadata.LLM_BATCH
+METADATA_BATCH = 4
+
+METADATA_PROMPT = """Extract the title, author(s), publication, year of publication, abstract and the publisher from the text. 
 Return the result in valid JSON format with the following keys: Title, Author, Publication, Year, Publisher and Abstract.
 If a field is not found, leave it as an empty string.
     
@@ -33,146 +51,201 @@ Example format:
   "Abstract": "Abstract text"
 }"""
 
+def extract_metadata_with_llm(text, llm, cache=None):
+    """Extract metadata using LLM with improved JSON handling"""
     # Create message
-    message = HumanMessage(content=prompt + "\n\n" + text)
+    message = HumanMessage(content=METADATA_PROMPT + "\n\n" + text)
     
     try:
-        # Get response from LLM
-        response = llm.invoke([message])
-        response_text = response.content
-        
-        # Try to parse JSON response
-        try:
-            metadata = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Fallback to basic parsing if JSON parsing fails
-            metadata = {
-                "Title": "",
-                "Author": "",
-                "Publication": "",
-                "Year": "",
-                "Publisher": "",
-                "Abstract": ""
-            }
-            
-            for line in response_text.split('\n'):
-                for key in metadata.keys():
-                    if key in line:
-                        parts = line.split(":")
-                        if len(parts) > 1:
-                            metadata[key] = parts[1].strip().strip('"')
-                            break
-            
-            # Ensure all required keys are present
-            for key in ["Title", "Author", "Publication", "Year", "Publisher", "Abstract"]:
-                if key not in metadata:
-                    metadata[key] = ""
-        
-        return metadata
+        # Reuse the reply from an earlier run for the same model, prompt and text
+        response_text = cache.get(llm, METADATA_PROMPT, text) if cache is not None else None
+        if response_text is None:
+            # Get response from LLM
+            response_text = llm.invoke([message]).content
+            if cache is not None:
+                cache.put(llm, METADATA_PROMPT, text, response_text)
+        return parse_metadata(response_text, METADATA_KEYS)
     
     except Exception as e:
         print(f"Error extracting metadata with LLM: {str(e)}")
-        return {
-            "Title": "",
-            "Author": "",
-            "Publication": "",
-            "Year": "",
-            "Publisher": "",
-            "Abstract": ""
-        }
+        return empty_metadata(METADATA_KEYS)
 
-def process_pdf(pdf_path):
-    """Convert PDF to text with metadata"""
+async def first_page_metadata(extractor, pdf_path):
+    """LLM metadata for the first page of pdf_path, read on a worker thread"""
+    texts = await asyncio.to_thread(extract_range, (pdf_path, 0, 1))
+    if not texts:
+        return empty_metadata(METADATA_KEYS)
+    return await extractor.aextract(texts[0])
+
+def process_pdf(pdf_path, pages=None, llm=None, first_page=None):
+    """Yield each page of a PDF as text with metadata, including LLM-extracted metadata from page 1.
+
+    Every page gets the bibliographic fields; only page 1 carries the Abstract.
+
+    pages is an iterable of (page_number, text) if the text is being extracted
+    elsewhere; otherwise the file is read here, one page range at a time.
+    Pass llm to share one client across files, or first_page (a dict, or a
+    future from MetadataExtractor.submit) if page 1 has already been sent
+    to the LLM.
+    """
 
     # Initialize LLM
-    llm = init_chat_model("llama-3.1-8b-instant", model_provider="groq")
+    if llm is None and first_page is None:
+        llm = init_chat_model("llama-3.1-8b-instant", model_provider="groq")
     
-    try:
-        reader = PdfReader(pdf_path)
-        documents = []
-        for i, page in enumerate(reader.pages):
-            metadatas = {}
-            text = page.extract_text()
-            if i == 0:
+    if pages is None:
+        _, pages = next(extract_files([pdf_path]))
+    bibliographic = {}
+    for page_number, text in pages:
+        metadatas = {}
+        if page_number == 1:
+            if first_page is None:
                 metadatas = extract_metadata_with_llm(text, llm)
-            metadata = {
-                "page_number": i + 1,
-                "word_count": len(text.split()) if text else 0,
-                "source_file": os.path.basename(pdf_path),
-                **metadatas
-            }
-            documents.append({
-                "text": text,
-                "metadata": metadata
-            })
-        return documents
-    except Exception as e:
-        print(f"Error processing {pdf_path}: {str(e)}")
-        return []
+            elif isinstance(first_page, dict):
+                metadatas = first_page
+            else:
+                try:
+                    metadatas = first_page.result()
+                except Exception as e:
+                    print(f"Error extracting metadata with LLM: {str(e)}")
+                    metadatas = empty_metadata(METADATA_KEYS)
+            # Later pages carry the bibliographic fields too, so corpus queries can filter on them
+            bibliographic = {key: value for key, value in metadatas.items() if key != "Abstract"}
+        metadata = {
+            "page_number": page_number,
+            "word_count": len(text.split()) if text else 0,
+            "source_file": os.path.basename(pdf_path),
+            **bibliographic,
+            **metadatas
+        }
+        yield {
+            "text": text,
+            "metadata": metadata
+        }
 
-def main():
+def main(workers=1, batch_size=BATCH_SIZE, max_bytes=MAX_BATCH_BYTES, text_cache=TEXT_CACHE,
+         chunk_tokens=CHUNK_TOKENS, overlap=OVERLAP_TOKENS, embed_cache=EMBED_CACHE,
+         corpus=None, shards=None, backend=None, chroma_path=None, index=None,
+         concurrency=8, llm_cache=LLM_CACHE, llm_batch=METADATA_BATCH, rules=True, threshold=CONFIDENCE,
+         client=None, embedding_function=None):
     # Load environment variables
     load_dotenv()
+    
+    # Layout falls back to CHROMA_CORPUS / CHROMA_CORPUS_SHARDS
+    env_corpus, env_shards = corpus_settings()
+    corpus = corpus or env_corpus
+    shards = shards or env_shards
 
-    # Get Chroma Cloud credentials
-    ch_api_key = os.getenv('CHROMA_API_KEY')
-    ch_tenant = os.getenv('CHROMA_TENANT')
-    ch_database = os.getenv('CHROMA_DATABASE')
+    if client is None:
+        # Chroma Cloud, a local embedded store or an in-memory one
+        client = get_client(backend, chroma_path)
     
-    if not all([ch_api_key, ch_tenant, ch_database]):
-        raise ValueError("Missing Chroma Cloud credentials in environment variables")
+    # Plan once: list collections a single time and keep only PDFs without one
+    pdf_dir = "pdf"
+    pdf_paths, skipped = plan_ingest(client, pdf_dir, corpus, shards)
     
-    # Initialize Chroma Cloud client
-    client = CloudClient(
-        tenant=ch_tenant,
-        database=ch_database,
-        api_key=ch_api_key
-    )
+    print(f"Found {len(pdf_paths) + skipped} PDF files, {skipped} already uploaded, {len(pdf_paths)} to process")
+    if not pdf_paths:
+        return None
     
-    # Get all PDF files in the pdf directory
-    pdf_dir = "pdf"
-    pdf_files = [f for f in os.listdir(pdf_dir) if f.endswith('.pdf')]
+    # One LLM client for the whole run, with up to concurrency calls in flight, each carrying up to llm_batch first pages
+    # Papers whose first page was sent on an earlier run are answered from the LLM cache,
+    # and papers the rule-based extractor reads with confidence skip the LLM entirely
+    llm = init_chat_model("llama-3.1-8b-instant", model_provider="groq")
+    extractor = MetadataExtractor(llm, METADATA_PROMPT, METADATA_KEYS, concurrency,
+                                  cache=LLMCache(llm_cache) if llm_cache else None, batch_size=llm_batch,
+                                  required=RULE_FIELDS if rules else None, threshold=threshold)
+    
+    # Page 1 of upcoming files goes to the LLM while earlier files are extracted and uploaded
+    upcoming = iter(pdf_paths)
+    requested = {}
+    def request_metadata():
+        for pdf_path in itertools.islice(upcoming, max(0, concurrency * llm_batch * 2 - len(requested))):
+            requested[pdf_path] = extractor.submit(first_page_metadata(extractor, pdf_path))
+    request_metadata()
     
-    print(f"Found {len(pdf_files)} PDF files to process")
+    # Extract text across files (and page ranges of large files) on worker processes
+    # Pages extracted on earlier runs are read back from the text cache
+    cache = TextCache(text_cache) if text_cache else None
+    extracted = extract_files(pdf_paths, workers, cache=cache)
     
-    # Process each PDF file
-    for idx, pdf_file in enumerate(pdf_files, 1):
-        pdf_path = os.path.join(pdf_dir, pdf_file)
-        print(f"\nProcessing {pdf_file} ({idx}/{len(pdf_files)})")
-        
-        try:
-            # Process PDF
-            documents = process_pdf(pdf_path)
+    # Embed locally in batches; vectors already in the embedding cache cost nothing
+    embedder = Embedder(embedding_function, cache=EmbeddingCache(embed_cache) if embed_cache else None)
+    
+    # Batches upload on a background thread while the next pages are extracted
+    with extractor, Uploader(client, batch_size, max_bytes, embedder=embedder,
+                             configuration=index) as uploader:
+        for idx, (pdf_path, pages) in enumerate(extracted, 1):
+            pdf_file = os.path.basename(pdf_path)
+            print(f"\nProcessing {pdf_file} ({idx}/{len(pdf_paths)})")
             
-            if not documents:
-                print(f"No documents extracted from {pdf_file}")
-                continue
+            try:
+                request_metadata()
                 
-            # Create collection name from file name
-            collection_name = os.path.splitext(pdf_file)[0]
-            
-            # Check if collection exists
-            existing_collections = client.list_collections()
-            if collection_name in [col.name for col in existing_collections]:
-                print(f"Collection '{collection_name}' already exists. Skipping...")
-                continue
+                # Create collection name from file name
+                collection_name = os.path.splitext(pdf_file)[0]
+                docs = process_pdf(pdf_path, pages, first_page=requested.pop(pdf_path))
+                docs = collection_documents(collection_name, docs, chunk_tokens, overlap)
+                # Corpus layout: every paper goes into one (sharded) collection
+                target = shard_for(pdf_file, corpus, shards) if corpus else collection_name
+                queued = uploader.submit(target, docs)
                 
-            # Create new collection
-            collection = client.create_collection(name=collection_name)
-            
-            # Add documents to collection
-            for doc in documents:
-                collection.add(
-                    documents=doc["text"],
-                    metadatas=doc["metadata"],
-                    ids=f"{collection_name}_page_{doc['metadata']['page_number']}"
-                )
+                if not queued:
+                    print(f"No documents extracted from {pdf_file}")
+                    continue
+                    
+                print(f"Queued {queued} documents for '{target}'")
                 
-            print(f"✅ Successfully uploaded {len(documents)} pages to new collection '{collection_name}'")
-            
-        except Exception as e:
-            print(f"❌ Error uploading {pdf_file}: {str(e)}")
-            continue
+            except Exception as e:
+                print(f"❌ Error uploading {pdf_file}: {str(e)}")
+                continue
+    
+    print(f"Made {extractor.stats['calls']} LLM requests for first pages, {extractor.stats['rules']} read by "
+          f"rules alone, {extractor.stats['cached']} answered from the LLM cache")
+    return uploader.stats
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Upload the PDFs in pdf/ to Chroma with LLM-extracted metadata')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='Text extraction processes (default: CPU count)')
+    parser.add_argument('-b', '--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Pages per upload batch (default: {BATCH_SIZE})')
+    parser.add_argument('--max-bytes', type=int, default=MAX_BATCH_BYTES,
+                        help=f'Most document text per upload batch (default: {MAX_BATCH_BYTES})')
+    parser.add_argument('--chunk-tokens', type=int, default=CHUNK_TOKENS,
+                        help=f'Tokens per stored chunk, 0 for whole pages (default: {CHUNK_TOKENS})')
+    parser.add_argument('--overlap', type=int, default=OVERLAP_TOKENS,
+                        help=f'Tokens shared by consecutive chunks (default: {OVERLAP_TOKENS})')
+    parser.add_argument('--embed-cache', type=str, default=EMBED_CACHE,
+                        help=f'SQLite file of embedding vectors (default: {EMBED_CACHE})')
+    parser.add_argument('--no-embed-cache', action='store_true', help='Embed every document again')
+    parser.add_argument('--corpus', type=str,
+                        help='Store every paper in this one collection instead of one per PDF (default: $CHROMA_CORPUS)')
+    parser.add_argument('--shards', type=int,
+                        help='Split the corpus over this many collections (default: $CHROMA_CORPUS_SHARDS or 1)')
+    add_backend_arguments(parser)
+    add_index_arguments(parser)
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='LLM metadata calls in flight at once (default: 8)')
+    parser.add_argument('--llm-cache', type=str, default=LLM_CACHE,
+                        help=f'SQLite file of LLM replies (default: {LLM_CACHE})')
+    parser.add_argument('--no-llm-cache', action='store_true', help='Send every prompt to the LLM again')
+    parser.add_argument('--llm-batch', type=int, default=METADATA_BATCH,
+                        help=f'First pages per LLM request, 1 to send each on its own (default: {METADATA_BATCH})')
+    parser.add_argument('--no-rules', action='store_true',
+                        help='Send every first page to the LLM instead of reading what it can with rules first')
+    parser.add_argument('--rule-confidence', type=float, default=CONFIDENCE,
+                        help=f'Trust rule-extracted fields scored at least this, 0-1 (default: {CONFIDENCE})')
+    parser.add_argument('--text-cache', type=str, default=TEXT_CACHE,
+                        help=f'SQLite file of extracted page text (default: {TEXT_CACHE})')
+    parser.add_argument('--no-text-cache', action='store_true', help='Always re-extract text from the PDFs')
+    args = parser.parse_args()
+
+    text_cache = None if args.no_text_cache else args.text_cache
+    embed_cache = None if args.no_embed_cache else args.embed_cache
+    llm_cache = None if args.no_llm_cache else args.llm_cache
+    main(args.workers, args.batch_size, args.max_bytes, text_cache,
+         args.chunk_tokens, args.overlap, embed_cache, args.corpus, args.shards,
+         args.backend, args.chroma_path, index_from_args(args), args.concurrency, llm_cache,
+         args.llm_batch, not args.no_rules, args.rule_confidence)
@@ -1,84 +1,100 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-import random
 from tqdm import tqdm
-
-def search_google_scholar(query, n):
-    base_url = "https://scholar.google.com/scholar"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    }
-    params = {
-        'q': query,
-        'start': 0
-    }
-    results = []
-
-    total_pages = (n + 9) // 10  # Calculate total pages needed
+from article_writer import save_articles
+from gs_fetch import Fetcher
+from gs_checkpoint import CHECKPOINT_DIR, Checkpoint
+from http_cache import CACHE_DIR, ResponseCache
+from gs_parse import RESULT_CLASS, parse_html, is_block_page, has_results
+
+def search_google_scholar(query, n, mirrors=None, fetcher=None, checkpoint=None):
+    """Yield article rows for query, one results page at a time.
+
+    Pages are spread round-robin over mirrors and fetched concurrently by fetcher,
+    which also paces requests per host; rows still come out in page order.
+    With a checkpoint, pages it already holds are replayed instead of fetched
+    and every newly fetched page with results is recorded as soon as it is parsed.
+    A CAPTCHA or block page ends the crawl without being recorded, so a later
+    run picks up from there.
+    """
+    mirrors = mirrors or ["https://scholar.google.com/scholar"]
+    own_fetcher = fetcher is None
+    fetcher = fetcher or Fetcher()
+    collected = 0
+
+    offsets = list(range(0, n, 10))
+    pending = [start for start in offsets if not (checkpoint and checkpoint.done(start))]
+    if len(pending) < len(offsets):
+        print(f"Resuming: {len(offsets) - len(pending)} of {len(offsets)} pages already done")
+
+    # One job per missing results page; consecutive pages go to different mirrors
+    jobs = [(mirrors[(start // 10) % len(mirrors)], {'q': query, 'start': start}) for start in pending]
     print(f"Fetching {n} articles. This may take a few minutes...")
 
-    for start in tqdm(range(0, n, 10), total=total_pages, desc="Fetching pages"):
-        params['start'] = start
-        retry_count = 0
-        success = False
-
-        while retry_count < 3 and not success:
-            response = requests.get(base_url, params=params, headers=headers)
-            if response.status_code == 429:
-                retry_count += 1
-                delay = 2 ** retry_count + random.uniform(0, 1)  # Exponential backoff with jitter
-                print(f"Rate limited (429). Retrying in {delay:.1f} seconds...")
-                time.sleep(delay)
-            elif response.status_code != 200:
-                print(f"Error: Received status code {response.status_code} for page {start}")
-                break
+    responses = fetcher.fetch_iter(jobs)
+    try:
+        for start in tqdm(offsets, desc="Fetching pages"):
+            if checkpoint and checkpoint.done(start):
+                rows = checkpoint.rows(start)
             else:
-                success = True
-
-                soup = BeautifulSoup(response.text, 'html.parser')
-                items = soup.find_all('div', class_='gs_ri')
-
-                print(f"Found {len(items)} articles on page {start // 10 + 1}")
-
-                for item in items:
-                    title_tag = item.find('h3', class_='gs_rt')
-                    title = title_tag.get_text(strip=True) if title_tag else "N/A"
-
-                    url_tag = item.find('h3', class_='gs_rt').find('a') if item.find('h3', class_='gs_rt') else None
-                    url = url_tag['href'] if url_tag else "N/A"
-
-                    author_tag = item.find('div', class_='gs_a')
-                    author_text = author_tag.get_text(strip=True) if author_tag else "N/A"
-                    authors = author_text.split(' - ')[0].strip() if ' - ' in author_text else author_text
-
-                    year_tag = item.find('span', class_='gs_fl')
-                    year = year_tag.get_text(strip=True).split(' ')[-1].strip() if year_tag else "N/A"
-
-                    results.append({
-                        'Title': title,
-                        'Author': authors,
-                        'Year': year,
-                        'URL': url
-                    })
-
-                time.sleep(5 + random.uniform(0, 2))  # Randomized delay to avoid detection
-
-    print(f"Total articles collected: {len(results)}")
-    return results
-
-def save_to_csv(results, filename='articles.csv'):
-    df = pd.DataFrame(results)
-    df.to_csv(filename, index=False)
-    print(f"Results saved to {filename}")
+                response = next(responses)
+                if response is None:
+                    continue
+                if response.status_code != 200:
+                    print(f"Error: Received status code {response.status_code} for page {start}")
+                    continue
+
+                articles = parse_html(response.text, RESULT_CLASS)
+                if not articles and is_block_page(response.text):
+                    print(f"Error: Google Scholar served a CAPTCHA for page {start // 10 + 1}; "
+                          f"stopping here, re-run later to resume")
+                    break
+
+                print(f"Found {len(articles)} articles on page {start // 10 + 1}")
+
+                rows = [article.to_row() for article in articles]
+                # An empty page isn't recorded, so a resumed run fetches it again
+                if checkpoint and rows:
+                    checkpoint.record(start, rows)
+
+            collected += len(rows)
+            yield from rows
+    finally:
+        # Stop fetching pages nobody will read, and release a fetcher made here
+        responses.close()
+        if own_fetcher:
+            fetcher.close()
+
+    print(f"Total articles collected: {collected}")
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='Web scrape articles from Google Scholar')
     parser.add_argument('query', type=str, help='Search query for Google Scholar')
     parser.add_argument('-n', type=int, default=10, help='Number of articles to scrape (default: 10)')
+    parser.add_argument('-o', '--output', type=str, default='articles.csv',
+                        help='Output file, .csv or .jsonl (default: articles.csv)')
+    parser.add_argument('--mirror', action='append', dest='mirrors',
+                        help='Scholar search URL to use; repeat to spread pages over mirrors')
+    parser.add_argument('--rate', type=float, default=0.2,
+                        help='Requests per second allowed per host (default: 0.2)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Maximum requests in flight across all hosts (default: 4)')
+    parser.add_argument('--checkpoint-dir', type=str, default=CHECKPOINT_DIR,
+                        help=f'Where finished pages are recorded (default: {CHECKPOINT_DIR})')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Discard any checkpoint for this query and start over')
+    parser.add_argument('--cache-dir', type=str, default=CACHE_DIR,
+                        help=f'HTTP response cache directory (default: {CACHE_DIR})')
+    parser.add_argument('--cache-ttl', type=float, default=24,
+                        help='Hours before a cached page is revalidated (default: 24)')
+    parser.add_argument('--no-cache', action='store_true', help='Always go to the network')
     args = parser.parse_args()
 
-    results = search_google_scholar(args.query, args.n)
-    save_to_csv(results)
+    checkpoint = Checkpoint(args.query, args.checkpoint_dir)
+    if args.fresh:
+        checkpoint.clear()
+
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, ttl=args.cache_ttl * 3600)
+    # Only pages with results are cached, so a CAPTCHA isn't replayed for the whole TTL
+    with Fetcher(rate=args.rate, concurrency=args.concurrency, cache=cache, cacheable=has_results) as fetcher:
+        results = search_google_scholar(args.query, args.n, args.mirrors, fetcher, checkpoint)
+        save_articles(results, args.output)
@@ -0,0 +1,161 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CACHE_DIR = '.http_cache'
+
+# Headers describing the wire format, which no longer apply to the decoded body we store
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+def normalize_url(url, params=None):
+    """Canonical form of url plus params: lower-case scheme/host, sorted query, no fragment"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(str(k), str(v)) for k, v in params.items()]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(sorted(query)), ''))
+
+class ResponseCache:
+    """On-disk cache of GET responses with a TTL, validators and an LRU size budget.
+
+    Bodies live in files under directory; a SQLite index holds status, headers,
+    ETag/Last-Modified, when each entry was stored and last used. Safe to share
+    between threads.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=24 * 3600, max_bytes=1 << 30):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, 'bodies'), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT,
+            etag TEXT, last_modified TEXT, stored_at REAL, ttl REAL,
+            last_access REAL, size INTEGER)''')
+        self.db.commit()
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, 'bodies', key)
+
+    def lookup(self, url, params=None):
+        """Return the entry for url as a dict, or None"""
+        key = hashlib.sha256(normalize_url(url, params).encode('utf-8')).hexdigest()
+        with self.lock:
+            row = self.db.execute('SELECT url, status, headers, etag, last_modified, stored_at, ttl '
+                                  'FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or not os.path.exists(self._body_path(key)):
+                return None
+            self.db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.db.commit()
+        url, status, headers, etag, last_modified, stored_at, ttl = row
+        return {'key': key, 'url': url, 'status': status, 'headers': json.loads(headers),
+                'etag': etag, 'last_modified': last_modified, 'stored_at': stored_at, 'ttl': ttl}
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] < entry['ttl']
+
+    def validators(self, entry):
+        """Conditional request headers for revalidating entry"""
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def to_response(self, entry):
+        """Rebuild a requests.Response from a cache entry"""
+        with open(self._body_path(entry['key']), 'rb') as file:
+            body = file.read()
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = entry['url']
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response.from_cache = True
+        return response
+
+    def store(self, url, params, response, ttl=None, body=None):
+        """Save a 200 response under url plus params, then evict down to the size budget.
+
+        Pass body=b'' for streamed responses whose body is kept elsewhere; the
+        entry then only carries the validators for later conditional requests.
+        """
+        key = hashlib.sha256(normalize_url(url, params).encode('utf-8')).hexdigest()
+        body = response.content if body is None else body
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+
+        tmp_path = self._body_path(key) + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(body)
+        os.replace(tmp_path, self._body_path(key))
+
+        now = time.time()
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (key, response.url, response.status_code, json.dumps(headers),
+                             response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                             now, self.ttl if ttl is None else ttl, now, len(body)))
+            self.db.commit()
+        self.evict()
+
+    def refresh(self, entry, response):
+        """Record a 304 revalidation: the entry is fresh again and picks up new validators"""
+        with self.lock:
+            self.db.execute('UPDATE entries SET stored_at = ?, etag = COALESCE(?, etag), '
+                            'last_modified = COALESCE(?, last_modified) WHERE key = ?',
+                            (time.time(), response.headers.get('ETag'),
+                             response.headers.get('Last-Modified'), entry['key']))
+            self.db.commit()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self.lock:
+            total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self.db.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                if os.path.exists(self._body_path(key)):
+                    os.remove(self._body_path(key))
+                total -= size
+            self.db.commit()
+
+def cached_get(session, url, cache, params=None, ttl=None, cacheable=None, **kwargs):
+    """GET url through cache: fresh hits are served locally, stale ones are revalidated.
+
+    cacheable(response), if given, must pass before a 200 is stored or a
+    cached one served, so pages that only look like success (a CAPTCHA) are
+    fetched again next time instead of replayed for the whole TTL.
+    """
+    entry = cache.lookup(url, params)
+    if entry and cache.is_fresh(entry):
+        response = cache.to_response(entry)
+        if cacheable is None or cacheable(response):
+            return response
+        entry = None
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    if entry:
+        headers.update(cache.validators(entry))
+
+    response = session.get(url, params=params, headers=headers, **kwargs)
+    if entry and response.status_code == 304:
+        cache.refresh(entry, response)
+        return cache.to_response(entry)
+    if response.status_code == 200 and (cacheable is None or cacheable(response)):
+        cache.store(url, params, response, ttl)
+    return response
@@ -0,0 +1,95 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+LLM_CACHE = '.llm_cache.sqlite'
+
+def llm_settings(llm):
+    """(model name, temperature) of a LangChain chat model"""
+    model = getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or type(llm).__name__
+    return model, getattr(llm, 'temperature', None)
+
+def deterministic(llm):
+    """Whether llm samples at temperature 0, so a cached reply is the one it would give again"""
+    _, temperature = llm_settings(llm)
+    # ChatGroq sends a temperature of 0 as 1e-8
+    return temperature is not None and temperature <= 1e-8
+
+def sha256(value):
+    """Hash of a string, or of any JSON-serialisable value"""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """SQLite store of LLM replies with an LRU size budget.
+
+    Entries are keyed by model name, temperature, prompt template and a hash
+    of the inputs filled into it, so changing any of them is a miss. Safe to
+    share between threads.
+    """
+
+    def __init__(self, path=LLM_CACHE, max_bytes=256 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, model TEXT, temperature REAL, template_sha256 TEXT,
+            input_sha256 TEXT, content TEXT, size INTEGER, stored_at REAL, last_access REAL)''')
+        self.db.commit()
+
+    def _key(self, llm, template, inputs):
+        model, temperature = llm_settings(llm)
+        fields = (model, temperature, sha256(template), sha256(inputs))
+        return sha256(list(fields)), fields
+
+    def get(self, llm, template, inputs):
+        """Return the cached reply text, or None"""
+        key, _ = self._key(llm, template, inputs)
+        with self.lock:
+            row = self.db.execute('SELECT content FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            self.db.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.db.commit()
+        return row[0]
+
+    def put(self, llm, template, inputs, content):
+        """Save a reply, then evict down to the size budget"""
+        key, fields = self._key(llm, template, inputs)
+        now = time.time()
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (key, *fields, content, len(content.encode('utf-8')), now, now))
+            self.db.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used replies until the cache fits in max_bytes"""
+        with self.lock:
+            total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self.db.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                total -= size
+            self.db.commit()
+
+def cached_invoke(cache, prompt, llm, inputs):
+    """Run prompt | llm on inputs and return the reply text, through cache if one is given"""
+    if cache is not None:
+        content = cache.get(llm, prompt.template, inputs)
+        if content is not None:
+            return content
+    content = (prompt | llm).invoke(inputs).content
+    if cache is not None:
+        cache.put(llm, prompt.template, inputs, content)
+    return content
@@ -0,0 +1,271 @@
+import re
+import json
+import random
+import asyncio
+import threading
+from langchain_core.messages import HumanMessage
+from chroma_ingest import BYTES_PER_TOKEN
+from metadata_rules import rule_metadata, CONFIDENCE
+
+METADATA_KEYS = ["Title", "Author", "Publication", "Year", "Publisher"]
+
+# Batched requests: most papers per request, estimated prompt tokens per request,
+# and the (estimated) tokens of each first page that are sent
+LLM_BATCH = 8
+LLM_BATCH_TOKENS = 6000
+PAGE_TOKENS = 1500
+
+# Seconds a part-filled batch waits for more papers before it is sent
+BATCH_LINGER = 0.1
+
+BATCH_PROMPT = """Below are the first pages of {count} papers, each starting with a line "### Paper <id>".
+Do the following for every paper.
+
+{instructions}
+
+Return only a valid JSON array with one object per paper, in the same order. Each object has an "id" key
+holding the paper's id, plus the keys above."""
+
+def scalar_metadata(value):
+    """Chroma metadata values must be str, int, float or bool"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def empty_metadata(keys=METADATA_KEYS):
+    return {key: "" for key in keys}
+
+def parse_metadata(response_text, keys=METADATA_KEYS):
+    """Parse the model's reply as JSON, falling back to "Key: value" lines"""
+    try:
+        metadata = {key: scalar_metadata(value) for key, value in json.loads(response_text).items()}
+    except (json.JSONDecodeError, AttributeError):
+        # Fallback to basic parsing if JSON parsing fails
+        metadata = empty_metadata(keys)
+        for line in response_text.split('\n'):
+            for key in metadata.keys():
+                if key in line:
+                    parts = line.split(":")
+                    if len(parts) > 1:
+                        metadata[key] = parts[1].strip().strip('"')
+                        break
+
+    # Ensure all required keys are present
+    for key in keys:
+        metadata.setdefault(key, "")
+    return metadata
+
+def parse_batch(response_text, count, keys=METADATA_KEYS):
+    """Map paper index (0-based) to metadata from a JSON array reply.
+
+    Papers the reply leaves out, repeats or garbles are missing from the result.
+    """
+    start, end = response_text.find('['), response_text.rfind(']')
+    try:
+        items = json.loads(response_text[start:end + 1]) if start != -1 else None
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    results = {}
+    for item in items:
+        number = re.search(r'\d+', str(item.pop('id', ''))) if isinstance(item, dict) else None
+        index = int(number.group()) - 1 if number else -1
+        if 0 <= index < count and index not in results:
+            metadata = {key: scalar_metadata(value) for key, value in item.items()}
+            for key in keys:
+                metadata.setdefault(key, "")
+            results[index] = metadata
+    return results
+
+class MetadataExtractor:
+    """Runs LLM metadata extraction for many texts at once.
+
+    At most concurrency calls are in flight; failed calls are retried with
+    exponential backoff plus jitter and the last error is raised once every
+    attempt has failed. Async callers await aextract(); sync callers use
+    submit()/extract(), which run on a private event loop thread. With an
+    LLMCache, texts seen before are answered without calling the model.
+
+    With batch_size > 1, texts arriving together are packed (cut to
+    page_tokens each) into one request of up to batch_size papers and
+    batch_tokens estimated tokens, answered as a JSON array. Papers missing
+    from a malformed reply are retried in smaller batches, and finally on
+    their own with the single-paper prompt.
+
+    With required fields, the rule-based extractor (metadata_rules) reads
+    each text first. The LLM is only called when one of those fields is
+    scored below threshold; fields the rules are sure of (and any DOI)
+    override the model's reading.
+    """
+
+    def __init__(self, llm, prompt, keys=METADATA_KEYS, concurrency=8, retries=3, backoff=2.0, cache=None,
+                 batch_size=1, batch_tokens=LLM_BATCH_TOKENS, page_tokens=PAGE_TOKENS, linger=BATCH_LINGER,
+                 required=None, threshold=CONFIDENCE):
+        self.llm = llm
+        self.prompt = prompt
+        self.keys = keys
+        self.cache = cache
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.page_tokens = page_tokens
+        self.linger = linger
+        self.required = required
+        self.threshold = threshold
+        self.stats = {'calls': 0, 'cached': 0, 'rules': 0, 'batches': 0, 'splits': 0, 'retries': 0, 'failed': 0}
+        self._bound = None
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _bind(self):
+        """(Re)create the asyncio primitives for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._bound:
+            self._bound = loop
+            self.limit = asyncio.Semaphore(self.concurrency)
+            self._pending = []
+            self._pending_tokens = 0
+            self._timer = None
+            self._tasks = set()
+
+    def retry_delay(self, attempt):
+        return self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+
+    async def _invoke(self, content):
+        """Send one prompt, retrying failures, and return the reply text"""
+        message = HumanMessage(content=content)
+        async with self.limit:
+            for attempt in range(self.retries + 1):
+                try:
+                    self.stats['calls'] += 1
+                    response = await self.llm.ainvoke([message])
+                    return response.content
+                except Exception as e:
+                    if attempt == self.retries:
+                        self.stats['failed'] += 1
+                        raise
+                    self.stats['retries'] += 1
+                    delay = self.retry_delay(attempt)
+                    print(f"LLM call failed ({e}). Retrying in {delay:.1f} seconds...")
+                    await asyncio.sleep(delay)
+
+    async def aextract(self, text):
+        """Return the metadata dict for text"""
+        self._bind()
+        if not self.required:
+            return await self._aextract_llm(text)
+
+        found = {field: value for field, value in rule_metadata(text, self.threshold).items()
+                 if field in self.keys or field == 'DOI'}
+        if all(field in found for field in self.required):
+            self.stats['rules'] += 1
+            return {**empty_metadata(self.keys), **found}
+        metadata = await self._aextract_llm(text)
+        return {**metadata, **found}
+
+    async def _aextract_llm(self, text):
+        if self.cache is not None:
+            content = self.cache.get(self.llm, self.prompt, text)
+            if content is not None:
+                self.stats['cached'] += 1
+                return parse_metadata(content, self.keys)
+
+        if self.batch_size > 1:
+            return await self._enqueue(text)
+
+        content = await self._invoke(self.prompt + "\n\n" + text)
+        if self.cache is not None:
+            self.cache.put(self.llm, self.prompt, text, content)
+        return parse_metadata(content, self.keys)
+
+    def _enqueue(self, text):
+        """Add text to the batch being filled and return a future for its metadata"""
+        loop = asyncio.get_running_loop()
+        page = text[:self.page_tokens * BYTES_PER_TOKEN]
+        tokens = len(page) // BYTES_PER_TOKEN + 1
+        if self._pending and self._pending_tokens + tokens > self.batch_tokens:
+            self._flush()
+
+        future = loop.create_future()
+        self._pending.append((text, page, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        """Answer a batch of (text, page, future), splitting it when the reply is malformed"""
+        try:
+            if len(batch) == 1:
+                content = await self._invoke(self.prompt + "\n\n" + batch[0][1])
+                results = {0: parse_metadata(content, self.keys)}
+            else:
+                self.stats['batches'] += 1
+                papers = "\n\n".join(f"### Paper {index}\n{page}" for index, (_, page, _) in enumerate(batch, 1))
+                content = await self._invoke(BATCH_PROMPT.format(count=len(batch), instructions=self.prompt)
+                                             + "\n\n" + papers)
+                results = parse_batch(content, len(batch), self.keys)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for index, (text, _, future) in enumerate(batch):
+            if index in results:
+                if self.cache is not None:
+                    self.cache.put(self.llm, self.prompt, text, json.dumps(results[index]))
+                if not future.done():
+                    future.set_result(results[index])
+
+        missing = [item for index, item in enumerate(batch) if index not in results]
+        if missing:
+            # Retry what the reply left out; if it was all unusable, halve the batch
+            self.stats['splits'] += 1
+            half = len(missing) // 2
+            parts = [missing] if len(missing) < len(batch) else [missing[:half], missing[half:]]
+            await asyncio.gather(*(self._run_batch(part) for part in parts))
+
+    def submit(self, coro):
+        """Schedule coro on the background loop and return a concurrent.futures.Future"""
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+            self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def extract(self, text):
+        return self.submit(self.aextract(text)).result()
+
+    def close(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
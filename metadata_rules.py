@@ -0,0 +1,216 @@
+import re
+import datetime
+from collections import Counter
+
+# Fields scored at least this are trusted without asking the LLM
+CONFIDENCE = 0.7
+
+# Non-empty lines from the top of the first page searched for the title, authors and journal
+HEADER_LINES = 30
+
+DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)')
+YEAR_PATTERN = re.compile(r'(?<!\d)(19[5-9]\d|20\d\d)(?!\d)')
+LABEL_PATTERN = re.compile(r'^(title|author|authors|publication|journal|year|publisher)\s*:\s*(.+)$', re.I)
+ABSTRACT_PATTERN = re.compile(r'^(?:a\s?b\s?s\s?t\s?r\s?a\s?c\s?t|summary)\b[\s:.\-—]*', re.I)
+ABSTRACT_END = re.compile(r'^(?:key\s?words?|index terms|(?:1\.?|i\.)?\s*introduction)\b', re.I)
+
+# Lines whose year is the publication year rather than a cited one
+YEAR_CONTEXT = re.compile(r'©|\(c\)|copyright|published|accepted|available online|\bvol\b|volume|'
+                          r'\d\s*\((?:19|20)\d\d\)', re.I)
+
+JOURNAL_PATTERN = re.compile(r'\b(journal|proceedings|transactions|review|letters|quarterly|annals|bulletin|'
+                             r'conference|symposium|magazine)\b', re.I)
+JOURNAL_DETAILS = re.compile(r'\b(vol\b|volume|issue|no\.|issn|pp\.|pages)|\(\d{4}\)|\d+\s*\(\d+\)', re.I)
+# "Computers & Education 168 (2021) 104212": a journal name, then volume and year
+CITATION_LINE = re.compile(r'^([A-Z][\w&’\'\- ]+?)\s+\d+\s*(?:\(\d+\))?\s*\((?:19|20)\d\d\)')
+JOURNAL_START = re.compile(r'^(?:the\s+)?(?:international\s+)?(?:journal|proceedings|transactions|annals|'
+                           r'bulletin|ieee|acm)\b', re.I)
+NOT_JOURNAL = re.compile(r'homepage|contents lists|https?:|www\.', re.I)
+JOURNAL_TAIL = re.compile(r'\s*(?:[,;:]|\bvol\b|\bvolume\b|\bissue\b|\bno\.|\bissn\b|\bpp\.|\(|\d).*$', re.I)
+
+# Lines that are never the title or an author line
+BOILERPLATE = re.compile(r'doi|https?:|www\.|@|©|copyright|journal|proceedings|transactions|\bvol\b|volume|'
+                         r'issn|received|accepted|published|available online|abstract|keywords|article|'
+                         r'open access|licen[cs]e|creative commons|contents lists|homepage|preprint|'
+                         r'universit|department|institut|school of|college|faculty|laborator|hospital|'
+                         r'corresponding|e-?mail|page \d', re.I)
+
+# Chapter and section labels and running heads ("Chapter 3", "Part II", "Smith et al."), never part of the title
+SECTION_HEAD = re.compile(r'^(?:chapter|section|part|unit|module|appendix|lecture)\s+[\w.]+\s*[:.]?$|\bet al\b', re.I)
+
+# An author: one to three given names or initials, then a surname
+NAME_PATTERN = re.compile(r"(?:[A-Z][\w'’\-]*\.?\s+){1,3}(?:(?:van|von|de|der|da|di|del|le|la|bin|binti)\s+)*"
+                          r"[A-Z][\w'’\-]+")
+AUTHOR_SEPARATORS = re.compile(r'\s*(?:,|;|·|\band\b|&)\s*')
+# Affiliation and footnote marks after names
+AUTHOR_MARKS = re.compile(r'[\d*†‡§¶•]+|\b[a-f](?=,|\s|$)')
+
+PUBLISHERS = ['Elsevier', 'Springer', 'Wiley', 'IEEE', 'ACM', 'Taylor & Francis', 'Routledge', 'SAGE', 'MDPI',
+              'Oxford University Press', 'Cambridge University Press', 'Frontiers', 'PLOS', 'Nature Publishing',
+              'Emerald', 'IOP Publishing', 'De Gruyter', 'Hindawi', 'BMJ', 'Brill', 'JSTOR', 'Palgrave',
+              'World Scientific', 'IGI Global', 'Inderscience', 'Cell Press', 'American Psychological Association']
+
+# DOI registrant prefixes of the publishers above
+DOI_PUBLISHERS = {
+    '10.1016': 'Elsevier', '10.1007': 'Springer', '10.1186': 'Springer', '10.1002': 'Wiley', '10.1111': 'Wiley',
+    '10.1109': 'IEEE', '10.1145': 'ACM', '10.1080': 'Taylor & Francis', '10.4324': 'Routledge',
+    '10.1177': 'SAGE', '10.3390': 'MDPI', '10.1093': 'Oxford University Press',
+    '10.1017': 'Cambridge University Press', '10.3389': 'Frontiers', '10.1371': 'PLOS', '10.1038': 'Nature Publishing',
+    '10.1108': 'Emerald', '10.1088': 'IOP Publishing', '10.1515': 'De Gruyter', '10.1155': 'Hindawi',
+    '10.1136': 'BMJ', '10.1163': 'Brill', '10.1057': 'Palgrave', '10.1142': 'World Scientific',
+    '10.4018': 'IGI Global', '10.1504': 'Inderscience', '10.1037': 'American Psychological Association',
+}
+
+def author_names(line):
+    """Names in line if it reads as an author line, else []"""
+    if BOILERPLATE.search(line) or len(line.split()) > 40:
+        return []
+    parts = [part for part in AUTHOR_SEPARATORS.split(AUTHOR_MARKS.sub(' ', line)) if part.strip()]
+    names = [' '.join(part.split()) for part in parts if NAME_PATTERN.fullmatch(' '.join(part.split()))]
+    # Every part must be a name, and a single two-word "name" is as likely to be a heading
+    if not names or len(names) < len(parts) or (len(names) == 1 and not AUTHOR_MARKS.search(line)):
+        return []
+    return names
+
+def title_like(line):
+    words = line.split()
+    letters = sum(char.isalpha() for char in line)
+    return (2 <= len(words) <= 30 and letters >= 0.7 * len(line.replace(' ', ''))
+            and not BOILERPLATE.search(line) and not line.endswith(('.', ',')))
+
+def find_doi(text):
+    match = DOI_PATTERN.search(text)
+    return match.group(1).rstrip('.,;)]}') if match else None
+
+def find_year(lines):
+    """Return (year, confidence) from publication-context lines, else from the page header"""
+    latest = datetime.date.today().year + 1
+    contextual = [int(year) for line in lines if YEAR_CONTEXT.search(line)
+                  for year in YEAR_PATTERN.findall(line) if int(year) <= latest]
+    if contextual:
+        # Received/accepted/published dates: the last one is when it came out
+        return str(max(contextual)), 0.9
+    header = Counter(int(year) for line in lines[:HEADER_LINES]
+                     for year in YEAR_PATTERN.findall(line) if int(year) <= latest)
+    if len(header) == 1:
+        return str(next(iter(header))), 0.75
+    if header:
+        return str(header.most_common(1)[0][0]), 0.5
+    return None, 0.0
+
+def find_publication(lines):
+    """Return (journal or proceedings name, confidence) from the header lines"""
+    for line in lines[:HEADER_LINES]:
+        match = CITATION_LINE.match(line)
+        if match and len(match.group(1).split()) >= 2:
+            return match.group(1), 0.85
+        if NOT_JOURNAL.search(line) or line.lower().startswith(('abstract', 'keywords')):
+            continue
+        if JOURNAL_PATTERN.search(line):
+            name = JOURNAL_TAIL.sub('', line).strip(' -–—|')
+            if len(name.split()) < 2:
+                continue
+            if JOURNAL_DETAILS.search(line):
+                return name, 0.85
+            # A line that is nothing but "Journal of ..." is the masthead
+            return name, 0.75 if name == line and JOURNAL_START.match(line) else 0.6
+    return None, 0.0
+
+def find_publisher(text, doi):
+    if doi and doi.split('/')[0] in DOI_PUBLISHERS:
+        return DOI_PUBLISHERS[doi.split('/')[0]], 0.9
+    for publisher in PUBLISHERS:
+        if re.search(rf'\b{re.escape(publisher)}\b', text):
+            return publisher, 0.8
+    return None, 0.0
+
+def masthead(line, publication=None):
+    """Whether line is the journal's name (or a citation of it), a section label or a running head"""
+    return bool((publication and line.lower() == publication.lower()) or CITATION_LINE.match(line)
+                or JOURNAL_START.match(line) or SECTION_HEAD.search(line))
+
+def find_title_and_authors(lines, publication=None):
+    """Return ((title, confidence), (authors, confidence)) by position: the title sits right above the author line.
+
+    Lines naming the journal, section labels and running heads are never the
+    title. A candidate with other lines between it and the authors (a
+    masthead over the real title) is only kept as a low-confidence fallback,
+    and so is a wrapped title whose first line is a short fragment.
+    """
+    header = lines[:HEADER_LINES]
+    fallback = (None, 0.0), (None, 0.0)
+    for start, line in enumerate(header):
+        if not title_like(line) or author_names(line) or masthead(line, publication):
+            continue
+
+        # Titles wrap over a few lines; stop at the authors or anything that isn't title text
+        end = start + 1
+        while (end < min(start + 3, len(header)) and title_like(header[end]) and not author_names(header[end])
+               and not masthead(header[end], publication)):
+            end += 1
+        title = ' '.join(header[start:end])
+
+        names = []
+        gap = None
+        for offset, following in enumerate(header[end:end + 3]):
+            found = author_names(following)
+            # Past the first author line, a lone name is more likely an affiliation ("1Google Brain")
+            if found and (not names or len(found) > 1):
+                gap = offset if gap is None else gap
+                names.extend(found)
+            elif names:
+                break
+        # A two-word line over the title ("Original Research") could be a heading the rules don't know
+        if names and gap == 0 and not (end - start > 1 and len(line.split()) <= 2):
+            return (title, 0.8), (', '.join(names), 0.85)
+        # No author line right under it: keep looking, but remember the first candidate
+        if fallback[0][0] is None:
+            fallback = (title, 0.5), (', '.join(names) or None, 0.5)
+    return fallback
+
+def find_abstract(lines):
+    for index, line in enumerate(lines):
+        match = ABSTRACT_PATTERN.match(line)
+        if not match:
+            continue
+        body = [line[match.end():]] if line[match.end():].strip() else []
+        for following in lines[index + 1:]:
+            if ABSTRACT_END.match(following):
+                break
+            body.append(following)
+        abstract = ' '.join(' '.join(body).split())
+        return abstract, 0.85 if len(abstract.split()) >= 30 else 0.5
+    return None, 0.0
+
+def score_metadata(text):
+    """Heuristic metadata for a first page as {field: (value, confidence)}.
+
+    Only fields something was found for are included; confidence is 0-1.
+    Labelled lines ("Title: ...") win over everything else.
+    """
+    lines = [' '.join(line.split()) for line in (text or '').split('\n') if line.strip()]
+    doi = find_doi(text or '')
+
+    scored = {}
+    if doi:
+        scored['DOI'] = (doi, 0.95)
+    publication = find_publication(lines)
+    (title, author) = find_title_and_authors(lines, publication[0])
+    for field, (value, confidence) in (('Title', title), ('Author', author), ('Year', find_year(lines)),
+                                       ('Publication', publication),
+                                       ('Publisher', find_publisher(text or '', doi)),
+                                       ('Abstract', find_abstract(lines))):
+        if value:
+            scored[field] = (value, confidence)
+
+    fields = {'authors': 'Author', 'journal': 'Publication'}
+    for line in lines:
+        match = LABEL_PATTERN.match(line)
+        if match:
+            field = fields.get(match.group(1).lower(), match.group(1).capitalize())
+            scored[field] = (match.group(2).strip(), 0.95)
+    return scored
+
+def rule_metadata(text, threshold=CONFIDENCE):
+    """{field: value} for the fields score_metadata is at least threshold sure of"""
+    return {field: value for field, (value, confidence) in score_metadata(text).items() if confidence >= threshold}
@@ -0,0 +1,121 @@
+import os
+from chroma_backend import get_client, add_backend_arguments, add_index_arguments, index_from_args, sync_collection
+from dotenv import load_dotenv
+from corpus import existing_collection_names, shard_names, shard_for, corpus_settings, CORPUS_NAME
+from llm_metadata import METADATA_KEYS
+
+# Documents read from a per-PDF collection and written to the corpus per round trip
+MIGRATE_BATCH = 256
+
+def migrate_collection(source, target, batch_size=MIGRATE_BATCH):
+    """Stream one per-PDF collection into target in batches and return how many documents were copied.
+
+    Stored embeddings are copied as they are, so nothing is embedded again.
+    upsert makes re-running an interrupted migration safe. Page 1's
+    bibliographic fields are copied onto every page, as uploads into the
+    corpus do, so corpus queries can filter any page on them.
+    """
+    source_file = f"{source.name}.pdf"
+    first_page = source.get(where={"page_number": 1}, include=["metadatas"])["metadatas"]
+    bibliographic = {key: value for metadata in first_page for key, value in (metadata or {}).items()
+                     if key in METADATA_KEYS and value}
+
+    def rewrite(ids, metadatas):
+        # Ids must stay unique once every paper shares one collection
+        return ([doc_id if doc_id.startswith(f"{source.name}_") else f"{source.name}_{doc_id}" for doc_id in ids],
+                [{**bibliographic, **{key: value for key, value in (metadata or {}).items() if value != ""},
+                  "source_file": (metadata or {}).get("source_file") or source_file}
+                 for metadata in metadatas])
+
+    return sync_collection(source, target, batch_size, rewrite)
+
+def per_pdf_collections(client, pdf_dir="pdf"):
+    """Names of the collections upload_pdf made for the PDFs in pdf_dir, one per file"""
+    if not os.path.isdir(pdf_dir):
+        return []
+    pdf_names = {os.path.splitext(pdf_file)[0] for pdf_file in os.listdir(pdf_dir) if pdf_file.endswith('.pdf')}
+    return sorted(existing_collection_names(client) & pdf_names)
+
+def migrate(client, corpus=CORPUS_NAME, shards=1, batch_size=MIGRATE_BATCH, delete=False, index=None, names=None,
+            pdf_dir="pdf"):
+    """Copy per-PDF collections into the corpus layout; optionally delete the originals.
+
+    names defaults to the collections named after a PDF in pdf_dir, so other
+    collections and corpora on the server are left alone. index (see
+    chroma_backend.index_configuration) sets up the HNSW index of new corpus collections.
+    """
+    targets = shard_names(corpus, shards)
+    names = sorted(set(names or per_pdf_collections(client, pdf_dir)) - set(targets))
+
+    print(f"Found {len(names)} collections to migrate into {', '.join(targets)}")
+
+    collections = {}
+    total = 0
+    for idx, name in enumerate(names, 1):
+        print(f"\nMigrating collection '{name}' ({idx}/{len(names)})")
+        try:
+            shard = shard_for(f"{name}.pdf", corpus, shards)
+            if shard not in collections:
+                kwargs = {'configuration': index} if index else {}
+                collections[shard] = client.get_or_create_collection(name=shard, **kwargs)
+            source = client.get_collection(name=name)
+            copied = migrate_collection(source, collections[shard], batch_size)
+            total += copied
+
+            if delete and copied == source.count():
+                client.delete_collection(name=name)
+            print(f"✅ Copied {copied} documents to '{shard}'{' and deleted the original' if delete else ''}")
+
+        except Exception as e:
+            print(f"❌ Error migrating collection '{name}': {str(e)}")
+            continue
+
+    print(f"\nMigrated {total} documents from {len(names)} collections")
+    return total
+
+def main(corpus=None, shards=None, batch_size=MIGRATE_BATCH, delete=False, backend=None, chroma_path=None,
+         index=None, names=None, pdf_dir="pdf", yes=False):
+    # Load environment variables
+    load_dotenv()
+
+    env_corpus, env_shards = corpus_settings()
+    corpus = corpus or env_corpus or CORPUS_NAME
+    shards = shards or env_shards
+
+    # Chroma Cloud, a local embedded store or an in-memory one
+    client = get_client(backend, chroma_path)
+
+    # Deleting collections found by matching file names needs a yes from the user
+    if delete and not names and not yes:
+        found = per_pdf_collections(client, pdf_dir)
+        print(f"--delete will remove {len(found)} collections once copied: {', '.join(found[:10])}"
+              f"{' ...' if len(found) > 10 else ''}")
+        if input("Continue? [y/N] ").strip().lower() not in ('y', 'yes'):
+            print("Aborted")
+            return
+
+    migrate(client, corpus, shards, batch_size, delete, index, names, pdf_dir)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Move per-PDF Chroma collections into one corpus collection')
+    parser.add_argument('--corpus', type=str,
+                        help=f'Corpus collection name (default: $CHROMA_CORPUS or {CORPUS_NAME})')
+    parser.add_argument('--shards', type=int,
+                        help='Split the corpus over this many collections (default: $CHROMA_CORPUS_SHARDS or 1)')
+    parser.add_argument('-b', '--batch-size', type=int, default=MIGRATE_BATCH,
+                        help=f'Documents per round trip (default: {MIGRATE_BATCH})')
+    parser.add_argument('-c', '--collections', type=str, nargs='+',
+                        help='Collections to migrate (default: those named after a PDF in --pdf-dir)')
+    parser.add_argument('--pdf-dir', type=str, default='pdf',
+                        help='Directory whose PDFs name the per-PDF collections (default: pdf)')
+    parser.add_argument('--delete', action='store_true',
+                        help='Delete each per-PDF collection once all of its documents are copied')
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help='With --delete and no --collections, delete without asking')
+    add_backend_arguments(parser)
+    add_index_arguments(parser)
+    args = parser.parse_args()
+
+    main(args.corpus, args.shards, args.batch_size, args.delete, args.backend, args.chroma_path,
+         index_from_args(args), args.collections, args.pdf_dir, args.yes)
@@ -1,9 +1,10 @@
-import os
-from chromadb import CloudClient
+from chroma_backend import get_client
 from langchain_core.prompts import PromptTemplate
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 import tiktoken
+from corpus import corpus_settings, query_corpus
+from llm_cache import LLMCache, cached_invoke, deterministic
 
 def query_collection(chroma_client, collection_name, query_criteria):
     # Perform query on a single collection
@@ -31,7 +32,7 @@ def prepare_retrieval_data(results):
         formatted_retrieval += f"Metadata: {result['metadata']}\n\n"
     return formatted_retrieval
 
-def summarize_long_text(text, llm, encoder=tiktoken.get_encoding("cl100k_base")):
+def summarize_long_text(text, llm, encoder=tiktoken.get_encoding("cl100k_base"), cache=None):
     # Calculate number of tokens in text
     tokens = encoder.encode(text)
     max_tokens = 7500  # 15KB / 1.25 (approx) tokens per char = 7500 tokens
@@ -48,13 +49,11 @@ def summarize_long_text(text, llm, encoder=tiktoken.get_encoding("cl100k_base"))
         "Summary:"
     )
     
-    chain = summary_prompt | llm
-    
-    # Add token limit to the prompt and invoke
-    return chain.invoke({
+    # Add token limit to the prompt and invoke, reusing the summary from an earlier run if cached
+    return cached_invoke(cache, summary_prompt, llm, {
         "text": text,
         "token_limit": target_length
-    }).content
+    })
 
 def chunk_retrieval_data(text, max_chunk_size=7500):
     # Split text into chunks to manage token limits
@@ -95,37 +94,32 @@ def main():
     # Load environment variables
     load_dotenv()
 
-    # Get Chroma Cloud credentials
-    ch_api_key = os.getenv('CHROMA_API_KEY')
-    ch_tenant = os.getenv('CHROMA_TENANT')
-    ch_database = os.getenv('CHROMA_DATABASE')
-    
-    if not all([ch_api_key, ch_tenant, ch_database]):
-        raise ValueError("Missing Chroma Cloud credentials in environment variables")
-    
-    # Initialize Chroma Cloud client
-    chroma_client = CloudClient(
-        tenant=ch_tenant,
-        database=ch_database,
-        api_key=ch_api_key
-    )
+    # Chroma Cloud, a local embedded store or an in-memory one (CHROMA_BACKEND)
+    chroma_client = get_client()
 
-    # Get all collection names from ChromaDB
-    all_collections = chroma_client.list_collections()
-    collection_names = [collection.name for collection in all_collections]
-    
-    # Query each collection one by one
-    all_results = []
     query_criteria = {
         "text": "text",
         "n_results": 5 
     }
     
-    # Read all collections
-    for collection_name in collection_names:  
-        print(f"Querying collection: {collection_name}")
-        results = query_collection(chroma_client, collection_name, query_criteria)
-        all_results.extend(results)
+    corpus, shards = corpus_settings()
+    if corpus:
+        # Corpus layout: one ANN search over every paper instead of one query per collection
+        print(f"Querying corpus: {corpus}")
+        all_results = query_corpus(chroma_client, query_criteria["text"], query_criteria["n_results"], corpus, shards)
+    else:
+        # Get all collection names from ChromaDB
+        all_collections = chroma_client.list_collections()
+        collection_names = [collection.name for collection in all_collections]
+    
+        # Query each collection one by one
+        all_results = []
+        
+        # Read all collections
+        for collection_name in collection_names:  
+            print(f"Querying collection: {collection_name}")
+            results = query_collection(chroma_client, collection_name, query_criteria)
+            all_results.extend(results)
     
     # Prepare retrieved data
     llm_retrieval_data = prepare_retrieval_data(all_results)
@@ -133,6 +127,10 @@ def main():
     # Initialize LLM
     llm = ChatGroq(temperature=0.3, model_name="llama-3.1-8b-instant")
     
+    # Replies are cached on disk by model, temperature, prompt and input; unchanged chunks cost no tokens.
+    # Only a temperature-0 model gives the same answer twice, so sampled replies aren't replayed from the cache
+    cache = LLMCache() if deterministic(llm) else None
+    
     # Token management for input text
     # 1. Split data into chunks
     chunks = chunk_retrieval_data(llm_retrieval_data)
@@ -142,7 +140,7 @@ def main():
     chunk_categorizations = []
     for i, chunk in enumerate(chunks):
         # 2a. Summarize each chunk if needed
-        summarized_chunk = summarize_long_text(chunk, llm)
+        summarized_chunk = summarize_long_text(chunk, llm, cache=cache)
         
         # 2b. Categorize this chunk with a more generic instruction
         prompt = PromptTemplate.from_template(
@@ -164,12 +162,10 @@ def main():
             "Text to analyze:\n\n{text}"
         )
         
-        chain = prompt | llm
-        chunk_categorization = chain.invoke({"text": summarized_chunk, "context": "research design"})
+        chunk_categorization = cached_invoke(cache, prompt, llm, {"text": summarized_chunk, "context": "research design"})
         
         # Add chunk number to the categorization
-        chunk_categorization.content = f"Chunk {i+1} overview:\n{chunk_categorization.content}"
-        chunk_categorizations.append(chunk_categorization.content)
+        chunk_categorizations.append(f"Chunk {i+1} overview:\n{chunk_categorization}")
         
         # Optional: add delay between requests to avoid hitting rate limits
         # time.sleep(1)
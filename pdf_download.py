@@ -0,0 +1,169 @@
+import os
+import csv
+import json
+import time
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from gs_fetch import DEFAULT_HEADERS
+from http_cache import ResponseCache
+from pdf_store import NotPDFError, PDFStore
+
+def read_urls(path, pdf_only=False):
+    """Read (url, title) pairs from an articles CSV or a plain one-URL-per-line list"""
+    with open(path, newline='', encoding='utf-8') as file:
+        if path.endswith('.csv'):
+            pairs = [(row['URL'], row.get('Title')) for row in csv.DictReader(file)]
+        else:
+            pairs = [(line.strip(), None) for line in file]
+    pairs = [(url, title) for url, title in pairs if url and url != 'N/A']
+    if pdf_only:
+        pairs = [(url, title) for url, title in pairs if url.endswith('.pdf')]
+    # Keep the first occurrence of each URL
+    unique = {}
+    for url, title in pairs:
+        unique.setdefault(url, title)
+    return list(unique.items())
+
+class Downloader:
+    """Download many PDFs concurrently, streaming each one into a PDFStore.
+
+    workers threads share one pooled session, and at most per_host downloads run
+    against any single host. Bodies are validated and hashed as they stream in,
+    so non-PDF responses never reach disk and a paper served by two URLs is
+    stored once. URLs already in the store are skipped; with a ResponseCache
+    they are revalidated with a conditional GET once their entry goes stale.
+    """
+
+    def __init__(self, store, workers=8, per_host=2, timeout=(10, 60),
+                 chunk_size=1 << 16, cache=None):
+        self.store = store
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        self.host_limits = {}
+        self.lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            return self.host_limits.setdefault(host, threading.BoundedSemaphore(self.per_host))
+
+    def download(self, url, title=None):
+        """Download url into the store and return a result record"""
+        result = {'url': url, 'sha256': None, 'status': 'failed', 'bytes': 0, 'seconds': 0.0}
+
+        # Already stored: skip outright, or revalidate when the cache says it is stale
+        headers = {}
+        known = self.store.lookup_url(url)
+        entry = self.cache.lookup(url) if self.cache and known else None
+        if known and (entry is None or self.cache.is_fresh(entry)):
+            self.store.record(known, title=title)
+            result.update(sha256=known, status='cached')
+            return result
+        if entry:
+            headers = self.cache.validators(entry)
+
+        start = time.perf_counter()
+        try:
+            with self._host_limit(url):
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if entry and response.status_code == 304:
+                        self.cache.refresh(entry, response)
+                        result.update(sha256=known, status='cached')
+                        return result
+                    response.raise_for_status()
+
+                    def chunks():
+                        for chunk in response.iter_content(self.chunk_size):
+                            result['bytes'] += len(chunk)
+                            yield chunk
+
+                    digest, is_new = self.store.add(chunks(), url, title)
+                    if self.cache:
+                        self.cache.store(url, None, response, body=b'')
+
+            result.update(sha256=digest, status='ok' if is_new else 'duplicate')
+            print(f"Successfully downloaded {url} -> {self.store.path(digest)}"
+                  + ("" if is_new else " (duplicate)"))
+        except NotPDFError as e:
+            result.update(status='rejected', error=str(e))
+            print(f"Rejected {url}: {e}")
+        except requests.exceptions.RequestException as e:
+            result['error'] = str(e)
+            print(f"Error downloading {url}: {e}")
+        except OSError as e:
+            # Store write failures (disk full, permissions) fail this URL, not the run
+            result['error'] = str(e)
+            print(f"Error saving {url}: {e}")
+        finally:
+            result['seconds'] = round(time.perf_counter() - start, 3)
+        return result
+
+    def run(self, pairs):
+        """Download every (url, title) pair and return a report with per-URL results and totals"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(lambda pair: self.download(*pair), pairs))
+        elapsed = time.perf_counter() - start
+
+        total_bytes = sum(result['bytes'] for result in results)
+        counts = {status: sum(1 for result in results if result['status'] == status)
+                  for status in ('ok', 'duplicate', 'cached', 'rejected', 'failed')}
+        return {
+            **counts,
+            'bytes': total_bytes,
+            'seconds': round(elapsed, 3),
+            'bytes_per_sec': round(total_bytes / elapsed) if elapsed else 0,
+            'results': results
+        }
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Download PDFs listed in articles.csv or url.txt')
+    parser.add_argument('source', type=str, nargs='?', default='articles.csv',
+                        help='articles CSV (URL column) or text file with one URL per line (default: articles.csv)')
+    parser.add_argument('-d', '--directory', type=str, default='pdf', help='Download directory (default: pdf)')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Concurrent downloads (default: 8)')
+    parser.add_argument('--per-host', type=int, default=2, help='Concurrent downloads per host (default: 2)')
+    parser.add_argument('--connect-timeout', type=float, default=10, help='Connect timeout in seconds (default: 10)')
+    parser.add_argument('--read-timeout', type=float, default=60, help='Read timeout in seconds (default: 60)')
+    parser.add_argument('--pdf-only', action='store_true', help='Only download URLs ending in .pdf')
+    parser.add_argument('--report', type=str, default='download_report.json',
+                        help='Where to write the JSON report (default: download_report.json)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Skip stored URLs without ever revalidating them')
+    args = parser.parse_args(argv)
+
+    pairs = read_urls(args.source, args.pdf_only)
+    print(f"Downloading {len(pairs)} URLs from {args.source} into {args.directory}/")
+
+    # PDFs rarely change, so files on disk are trusted for 30 days before revalidating
+    cache = None if args.no_cache else ResponseCache(ttl=30 * 24 * 3600)
+    downloader = Downloader(PDFStore(args.directory), args.workers, args.per_host,
+                            (args.connect_timeout, args.read_timeout), cache=cache)
+    report = downloader.run(pairs)
+
+    with open(args.report, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+
+    print(f"\nDownload complete! ok: {report['ok']}, duplicate: {report['duplicate']}, cached: {report['cached']}, "
+          f"rejected: {report['rejected']}, failed: {report['failed']}, "
+          f"{report['bytes'] / 1e6:.1f} MB at {report['bytes_per_sec'] / 1e6:.2f} MB/s")
+    print(f"Report written to {args.report}")
+    return report
+
+if __name__ == '__main__':
+    main()
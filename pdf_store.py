@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import itertools
+import tempfile
+import threading
+
+INDEX_NAME = 'index.jsonl'
+
+# Readers accept the header anywhere in the first KiB, so junk before it is tolerated
+HEADER_WINDOW = 1024
+
+class NotPDFError(ValueError):
+    """Raised when a download does not start with a %PDF- header"""
+
+class PDFStore:
+    """Content-addressed PDF files, stored as <directory>/<sha256>.pdf.
+
+    An append-only index (index.jsonl) maps every source URL and article title
+    to the digest of the bytes it produced, so the same paper fetched from two
+    mirrors is stored once. Safe to share between threads.
+    """
+
+    def __init__(self, directory='pdf'):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.lock = threading.Lock()
+        self.by_url = {}
+        self.files = {}
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        continue
+
+    def _apply(self, record):
+        digest = record['sha256']
+        info = self.files.setdefault(digest, {'size': record['size'], 'urls': [], 'titles': []})
+        if record.get('url') and record['url'] not in info['urls']:
+            info['urls'].append(record['url'])
+            self.by_url[record['url']] = digest
+        if record.get('title') and record['title'] not in info['titles']:
+            info['titles'].append(record['title'])
+
+    def path(self, digest):
+        return os.path.join(self.directory, f"{digest}.pdf")
+
+    def lookup_url(self, url):
+        """Digest previously downloaded from url, if its file is still in the store"""
+        digest = self.by_url.get(url)
+        return digest if digest and os.path.exists(self.path(digest)) else None
+
+    def titles(self, digest):
+        return list(self.files.get(digest, {}).get('titles', []))
+
+    def record(self, digest, url=None, title=None):
+        """Add a URL and/or title for an existing digest to the index"""
+        with self.lock:
+            info = self.files[digest]
+            if (not url or url in info['urls']) and (not title or title in info['titles']):
+                return
+            record = {'sha256': digest, 'size': info['size'], 'url': url, 'title': title}
+            self._apply(record)
+            with open(self.index_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def add(self, chunks, url=None, title=None):
+        """Store the bytes from an iterable of chunks and return (digest, is_new).
+
+        The %PDF- header is checked before anything is written, so HTML error
+        pages and other non-PDF bodies raise NotPDFError without touching disk.
+        """
+        chunks = iter(chunks)
+        head = b''
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= HEADER_WINDOW:
+                break
+        if b'%PDF-' not in head[:HEADER_WINDOW]:
+            raise NotPDFError(f"not a PDF (starts with {head[:16]!r})")
+
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.part', delete=False) as file:
+            tmp_path = file.name
+            try:
+                for chunk in itertools.chain([head], chunks):
+                    digest.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                file.close()
+                os.remove(tmp_path)
+                raise
+
+        digest = digest.hexdigest()
+        with self.lock:
+            is_new = not os.path.exists(self.path(digest))
+            if is_new:
+                # Temp files are created private; give the stored file normal permissions
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path(digest))
+            else:
+                os.remove(tmp_path)
+            self.files.setdefault(digest, {'size': size, 'urls': [], 'titles': []})
+        self.record(digest, url, title)
+        return digest, is_new
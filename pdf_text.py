@@ -0,0 +1,108 @@
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2 import PdfReader
+
+# Large files are split into ranges of this many pages so one thesis can use every core
+PAGES_PER_TASK = 25
+
+class PartialPDFError(RuntimeError):
+    """A page range failed after earlier pages of the same file were yielded"""
+
+def page_count(pdf_path):
+    return len(PdfReader(pdf_path).pages)
+
+def extract_range(task):
+    """Extract the text of pages [start, stop) of one PDF; None if the file can't be read"""
+    pdf_path, start, stop = task
+    if stop is None:
+        return None
+    if start == stop:
+        return []
+    try:
+        reader = PdfReader(pdf_path)
+        return [reader.pages[i].extract_text() for i in range(start, stop)]
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {str(e)}")
+        return None
+
+def plan_tasks(pdf_paths, pages_per_task=PAGES_PER_TASK):
+    """Yield (pdf_path, start, stop) page ranges covering every file, in order"""
+    for pdf_path in pdf_paths:
+        try:
+            count = page_count(pdf_path)
+        except Exception as e:
+            print(f"Error processing {pdf_path}: {str(e)}")
+            # Unreadable files still get a (failing) task so callers hear about every file
+            yield (pdf_path, 0, None)
+            continue
+        for start in range(0, count, pages_per_task) or [0]:
+            yield (pdf_path, start, min(count, start + pages_per_task))
+
+def map_tasks(tasks, workers=1):
+    """Yield (task, texts) for each task in order, running up to workers tasks at once.
+
+    Only about two tasks per worker are in flight, so memory stays bounded no
+    matter how many pages are queued.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield task, extract_range(task)
+        return
+
+    tasks = iter(tasks)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for task in itertools.islice(tasks, workers * 2):
+            pending.append((task, executor.submit(extract_range, task)))
+        while pending:
+            task, future = pending.popleft()
+            for next_task in itertools.islice(tasks, 1):
+                pending.append((next_task, executor.submit(extract_range, next_task)))
+            yield task, future.result()
+
+def extract_files(pdf_paths, workers=1, pages_per_task=PAGES_PER_TASK, cache=None):
+    """Yield (pdf_path, pages) for every file in order.
+
+    pages lazily yields (page_number, text) as ranges finish, so no file is ever
+    held in memory whole. A file that can't be read yields no pages; if a later
+    range fails, pages raises PartialPDFError so the file isn't taken as complete.
+    Consume each file's pages before moving on to the next file.
+
+    With a TextCache, files already extracted are read back from it instead
+    of being parsed again, and newly extracted pages are saved to it.
+    """
+    pdf_paths = list(pdf_paths)
+    digests = {pdf_path: cache.digest(pdf_path) for pdf_path in pdf_paths} if cache is not None else {}
+    todo = [pdf_path for pdf_path in pdf_paths if cache is None or not cache.has(digests[pdf_path])]
+
+    results = map_tasks(plan_tasks(todo, pages_per_task), workers)
+    groups = itertools.groupby(results, key=lambda result: result[0][0])
+    todo = set(todo)
+    for pdf_path in pdf_paths:
+        if pdf_path not in todo:
+            yield pdf_path, cache.pages(digests[pdf_path])
+            continue
+        _, group = next(groups)
+        yield pdf_path, _file_pages(group, cache, digests.get(pdf_path))
+
+def _file_pages(group, cache=None, digest=None):
+    count = 0
+    for (pdf_path, start, stop), texts in group:
+        if texts is None:
+            if count:
+                raise PartialPDFError(f"pages {start + 1}-{stop} of {pdf_path} could not be read")
+            return
+        pages = [(start + offset + 1, text) for offset, text in enumerate(texts)]
+        if cache is not None:
+            cache.store(digest, pages)
+        yield from pages
+        count = stop
+    if cache is not None:
+        cache.finish(digest, count)
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
@@ -0,0 +1,59 @@
+import time
+import sqlite3
+import threading
+from gs_parse import file_sha256
+
+TEXT_CACHE = '.text_cache.sqlite'
+
+class TextCache:
+    """SQLite store of extracted page text, keyed by the PDF's SHA-256 and page number.
+
+    A file counts as cached only once every page has been stored, so an
+    interrupted or failed extraction is redone on the next run. Renamed or
+    re-downloaded copies of the same PDF share one entry.
+    """
+
+    def __init__(self, path=TEXT_CACHE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS files (
+            sha256 TEXT PRIMARY KEY, page_count INTEGER, extracted_at REAL)''')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS pages (
+            sha256 TEXT, page_number INTEGER, text TEXT, word_count INTEGER, extracted_at REAL,
+            PRIMARY KEY (sha256, page_number))''')
+        self.db.commit()
+
+    def digest(self, pdf_path):
+        return file_sha256(pdf_path)
+
+    def has(self, digest):
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM files WHERE sha256 = ?', (digest,)).fetchone() is not None
+
+    def pages(self, digest, chunk=100):
+        """Lazily yield (page_number, text) for a cached file, chunk rows at a time"""
+        last = 0
+        while True:
+            with self.lock:
+                rows = self.db.execute('SELECT page_number, text FROM pages WHERE sha256 = ? AND page_number > ? '
+                                       'ORDER BY page_number LIMIT ?', (digest, last, chunk)).fetchall()
+            yield from rows
+            if len(rows) < chunk:
+                return
+            last = rows[-1][0]
+
+    def store(self, digest, pages):
+        """Save an iterable of (page_number, text) for digest"""
+        now = time.time()
+        rows = [(digest, page_number, text, len(text.split()) if text else 0, now) for page_number, text in pages]
+        with self.lock:
+            self.db.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)', rows)
+            self.db.commit()
+
+    def finish(self, digest, page_count):
+        """Mark digest complete once all page_count pages are stored"""
+        with self.lock:
+            self.db.execute('DELETE FROM pages WHERE sha256 = ? AND page_number > ?', (digest, page_count))
+            self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)', (digest, page_count, time.time()))
+            self.db.commit()
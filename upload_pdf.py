@@ -1,47 +1,58 @@
 import os
-from PyPDF2 import PdfReader
-from chromadb import CloudClient
+from chroma_backend import get_client, add_backend_arguments, add_index_arguments, index_from_args
 from dotenv import load_dotenv
+from pdf_text import extract_files
+from text_cache import TextCache, TEXT_CACHE
+from chunker import chunk_documents, CHUNK_TOKENS, OVERLAP_TOKENS
+from embed_cache import Embedder, EmbeddingCache, EMBED_CACHE
+from corpus import corpus_settings, shard_for
+from chroma_ingest import Uploader, BATCH_SIZE, MAX_BATCH_BYTES
 
-def process_pdf(pdf_path):
-    """Convert PDF to text with metadata"""
-    try:
-        reader = PdfReader(pdf_path)
-        documents = []
-        for i, page in enumerate(reader.pages):
-            text = page.extract_text()
-            metadata = {
-                "page_number": i + 1,
-                "word_count": len(text.split()) if text else 0,
-                "source_file": os.path.basename(pdf_path)
-            }
-            documents.append({
-                "text": text,
-                "metadata": metadata
-            })
-        return documents
-    except Exception as e:
-        print(f"Error processing {pdf_path}: {str(e)}")
-        return []
+def process_pdf(pdf_path, pages=None):
+    """Yield each page of a PDF as text with metadata.
 
-def main():
+    pages is an iterable of (page_number, text) if the text is being extracted
+    elsewhere; otherwise the file is read here, one page range at a time.
+    """
+    if pages is None:
+        _, pages = next(extract_files([pdf_path]))
+    for page_number, text in pages:
+        metadata = {
+            "page_number": page_number,
+            "word_count": len(text.split()) if text else 0,
+            "source_file": os.path.basename(pdf_path)
+        }
+        yield {
+            "text": text,
+            "metadata": metadata
+        }
+
+def page_documents(collection_name, docs):
+    """Give each page document its Chroma id"""
+    for doc in docs:
+        yield {"id": f"{collection_name}_page_{doc['metadata']['page_number']}", **doc}
+
+def collection_documents(collection_name, docs, chunk_tokens=CHUNK_TOKENS, overlap=OVERLAP_TOKENS):
+    """Token chunks of docs, or whole pages when chunk_tokens is 0"""
+    if chunk_tokens:
+        return chunk_documents(collection_name, docs, chunk_tokens, overlap)
+    return page_documents(collection_name, docs)
+
+def main(workers=1, batch_size=BATCH_SIZE, max_bytes=MAX_BATCH_BYTES, text_cache=TEXT_CACHE,
+         chunk_tokens=CHUNK_TOKENS, overlap=OVERLAP_TOKENS, embed_cache=EMBED_CACHE,
+         corpus=None, shards=None, upsert=False, backend=None, chroma_path=None, index=None,
+         client=None, embedding_function=None):
     # Load environment variables
     load_dotenv()
     
-    # Get Chroma Cloud credentials
-    ch_api_key = os.getenv('CHROMA_API_KEY')
-    ch_tenant = os.getenv('CHROMA_TENANT')
-    ch_database = os.getenv('CHROMA_DATABASE')
-    
-    if not all([ch_api_key, ch_tenant, ch_database]):
-        raise ValueError("Missing Chroma Cloud credentials in environment variables")
+    # Layout falls back to CHROMA_CORPUS / CHROMA_CORPUS_SHARDS
+    env_corpus, env_shards = corpus_settings()
+    corpus = corpus or env_corpus
+    shards = shards or env_shards
     
-    # Initialize Chroma Cloud client
-    client = CloudClient(
-        tenant=ch_tenant,
-        database=ch_database,
-        api_key=ch_api_key
-    )
+    if client is None:
+        # Chroma Cloud, a local embedded store or an in-memory one
+        client = get_client(backend, chroma_path)
     
     # Get all PDF files in the pdf directory
     pdf_dir = "pdf"
@@ -49,38 +60,73 @@ def main():
     
     print(f"Found {len(pdf_files)} PDF files to process")
     
-    # Process each PDF file
-    for idx, pdf_file in enumerate(pdf_files, 1):
-        pdf_path = os.path.join(pdf_dir, pdf_file)
-        print(f"\nProcessing {pdf_file} ({idx}/{len(pdf_files)})")
-        
-        try:
-            # Process PDF
-            documents = process_pdf(pdf_path)
+    # Extract text across files (and page ranges of large files) on worker processes
+    pdf_paths = [os.path.join(pdf_dir, pdf_file) for pdf_file in pdf_files]
+    # Pages extracted on earlier runs are read back from the text cache
+    cache = TextCache(text_cache) if text_cache else None
+    extracted = extract_files(pdf_paths, workers, cache=cache)
+    
+    # Batches upload on a background thread while the next pages are extracted
+    # Embed locally in batches; vectors already in the embedding cache cost nothing
+    embedder = Embedder(embedding_function, cache=EmbeddingCache(embed_cache) if embed_cache else None)
+    
+    with Uploader(client, batch_size, max_bytes, upsert=upsert, embedder=embedder,
+                  configuration=index) as uploader:
+        for idx, (pdf_path, pages) in enumerate(extracted, 1):
+            pdf_file = os.path.basename(pdf_path)
+            print(f"\nProcessing {pdf_file} ({idx}/{len(pdf_files)})")
             
-            if not documents:
-                print(f"No documents extracted from {pdf_file}")
-                continue
+            try:
+                # Create collection name from file name
+                collection_name = os.path.splitext(pdf_file)[0]
+                docs = collection_documents(collection_name, process_pdf(pdf_path, pages), chunk_tokens, overlap)
+                # Corpus layout: every paper goes into one (sharded) collection
+                target = shard_for(pdf_file, corpus, shards) if corpus else collection_name
+                queued = uploader.submit(target, docs)
                 
-            # Create collection name from file name
-            collection_name = os.path.splitext(pdf_file)[0]
-            
-            # Get or create collection
-            collection = client.get_or_create_collection(name=collection_name)
-            
-            # Add documents to collection
-            for doc in documents:
-                collection.add(
-                    documents=doc["text"],
-                    metadatas=doc["metadata"],
-                    ids=f"{collection_name}_page_{doc['metadata']['page_number']}"
-                )
+                if not queued:
+                    print(f"No documents extracted from {pdf_file}")
+                    continue
+                    
+                print(f"Queued {queued} documents from {pdf_file}")
                 
-            print(f"✅ Successfully uploaded {len(documents)} pages from {pdf_file}")
-            
-        except Exception as e:
-            print(f"❌ Error uploading {pdf_file}: {str(e)}")
-            continue
+            except Exception as e:
+                print(f"❌ Error uploading {pdf_file}: {str(e)}")
+                continue
+    
+    return uploader.stats
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Upload the PDFs in pdf/ to Chroma')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='Text extraction processes (default: CPU count)')
+    parser.add_argument('-b', '--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Pages per upload batch (default: {BATCH_SIZE})')
+    parser.add_argument('--max-bytes', type=int, default=MAX_BATCH_BYTES,
+                        help=f'Most document text per upload batch (default: {MAX_BATCH_BYTES})')
+    parser.add_argument('--upsert', action='store_true',
+                        help='Overwrite pages already in a collection instead of adding')
+    parser.add_argument('--chunk-tokens', type=int, default=CHUNK_TOKENS,
+                        help=f'Tokens per stored chunk, 0 for whole pages (default: {CHUNK_TOKENS})')
+    parser.add_argument('--overlap', type=int, default=OVERLAP_TOKENS,
+                        help=f'Tokens shared by consecutive chunks (default: {OVERLAP_TOKENS})')
+    parser.add_argument('--embed-cache', type=str, default=EMBED_CACHE,
+                        help=f'SQLite file of embedding vectors (default: {EMBED_CACHE})')
+    parser.add_argument('--no-embed-cache', action='store_true', help='Embed every document again')
+    parser.add_argument('--corpus', type=str,
+                        help='Store every paper in this one collection instead of one per PDF (default: $CHROMA_CORPUS)')
+    parser.add_argument('--shards', type=int,
+                        help='Split the corpus over this many collections (default: $CHROMA_CORPUS_SHARDS or 1)')
+    add_backend_arguments(parser)
+    add_index_arguments(parser)
+    parser.add_argument('--text-cache', type=str, default=TEXT_CACHE,
+                        help=f'SQLite file of extracted page text (default: {TEXT_CACHE})')
+    parser.add_argument('--no-text-cache', action='store_true', help='Always re-extract text from the PDFs')
+    args = parser.parse_args()
+
+    text_cache = None if args.no_text_cache else args.text_cache
+    embed_cache = None if args.no_embed_cache else args.embed_cache
+    main(args.workers, args.batch_size, args.max_bytes, text_cache,
+         args.chunk_tokens, args.overlap, embed_cache, args.corpus, args.shards,
+         args.upsert, args.backend, args.chroma_path, index_from_args(args))
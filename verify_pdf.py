@@ -1,38 +1,69 @@
 import os
-import subprocess
-
-def verify_and_rename_pdf_files(directory):
-    # Get all files in the directory
-    files = [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
-    
-    print(f"Found {len(files)} files in {directory}")
-    
-    for filename in files:
-        file_path = os.path.join(directory, filename)
-        
-        # Skip directories
-        if not os.path.isfile(file_path):
-            continue
-            
-        # Check if file has .pdf extension
-        if not filename.lower().endswith('.pdf'):
-            print(f"Skipping non-PDF file: {filename}")
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+
+# PDF readers look for the header in the first KiB and the trailer in the last KiB
+WINDOW = 1024
+
+def check_pdf(file_path):
+    """Classify a file as 'valid', 'truncated' or 'not_pdf' from its header and trailer.
+
+    Only the first and last KiB are touched (through mmap), so large files cost
+    no more than small ones.
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return 'not_pdf'
+
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data.find(b'%PDF-', 0, min(size, WINDOW)) == -1:
+            return 'not_pdf'
+
+        # A complete file ends with a startxref pointer followed by %%EOF
+        tail_start = max(0, size - WINDOW)
+        if data.rfind(b'%%EOF', tail_start) == -1 or data.rfind(b'startxref', tail_start) == -1:
+            return 'truncated'
+    return 'valid'
+
+def verify_pdf_files(directory, quarantine=None, workers=8):
+    """Check every .pdf in directory in parallel and move bad files into quarantine.
+
+    Returns a dict of counts per status.
+    """
+    quarantine = quarantine or os.path.join(directory, 'quarantine')
+
+    # Get all PDF files in the directory
+    files = [f for f in os.listdir(directory)
+             if f.lower().endswith('.pdf') and os.path.isfile(os.path.join(directory, f))]
+
+    print(f"Found {len(files)} PDF files in {directory}")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(check_pdf, [os.path.join(directory, f) for f in files]))
+
+    counts = {'valid': 0, 'truncated': 0, 'not_pdf': 0}
+    for filename, status in zip(files, statuses):
+        counts[status] += 1
+        if status == 'valid':
             continue
-            
-        # Check if file is actually a PDF using file command
-        result = subprocess.run(['file', '--mime-type', '-b', file_path], capture_output=True, text=True)
-        file_mime = result.stdout.strip()
-        
-        if file_mime == 'application/pdf':
-            print(f"✅ Valid PDF: {filename}")
-        else:
-            # Rename file by removing .pdf extension
-            new_filename = filename[:-4]  # Remove last 4 characters (.pdf)
-            new_file_path = os.path.join(directory, new_filename)
-            
-            os.rename(file_path, new_file_path)
-            print(f"❌ Not a PDF: {filename} → Renamed to {new_filename}")
+
+        # Move the file aside instead of renaming it in place
+        os.makedirs(quarantine, exist_ok=True)
+        os.replace(os.path.join(directory, filename), os.path.join(quarantine, filename))
+        label = "Truncated PDF" if status == 'truncated' else "Not a PDF"
+        print(f"❌ {label}: {filename} → moved to {quarantine}")
+
+    print(f"✅ Valid: {counts['valid']}, truncated: {counts['truncated']}, not PDF: {counts['not_pdf']}")
+    return counts
 
 if __name__ == '__main__':
-    pdf_directory = 'pdf'
-    verify_and_rename_pdf_files(pdf_directory)
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate downloaded PDFs and quarantine broken ones')
+    parser.add_argument('directory', type=str, nargs='?', default='pdf', help='PDF directory (default: pdf)')
+    parser.add_argument('-q', '--quarantine', type=str,
+                        help='Where bad files are moved (default: <directory>/quarantine)')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Parallel checks (default: 8)')
+    args = parser.parse_args()
+
+    verify_pdf_files(args.directory, args.quarantine, args.workers)